@@ -3,17 +3,28 @@
 Author: Piotr Krzysztof Lis - github.com/straightchlorine
 """
 
-import asyncio
+from concurrent import futures
+import itertools
 import multiprocessing
+from multiprocessing.connection import Connection, wait
+import os
+import threading
 
-from ahttpdc.read.fetch.fetcher import AsyncFetcher
-from ahttpdc.read.store.collector import AsyncCollector
+from ahttpdc.read.device import Device
+from ahttpdc.read.pipeline import ReadingQueue
+from ahttpdc.read.shard import HashRing
+from ahttpdc.read.worker import DaemonWorker
 
 __all__ = ['DataDaemon']
 
 
 class DataDaemon:
-    """Background process managing asynchronous data fetching and collecting.
+    """Background processes managing asynchronous data fetching and collecting.
+
+    Devices are split between worker processes by consistent hashing of
+    their URLs. Every worker polls its devices on its own event loop, with
+    its own queue, write batcher and spool, so throughput scales with the
+    number of cores. A supervisor thread restarts workers which crashed.
 
     Args:
         sensors (dict): Which sensors device has and what do they measure.
@@ -21,11 +32,69 @@ class DataDaemon:
         db_token (str): InfluxDB token to authenticate the user.
         db_org (str): Name of the InfluxDB organization
         db_bucket (str): Name of the InfluxDB bucket.
-        srv_url (str): URL address of the server, handling JSON data.
-        interval (int, optional): Interval between each fetch-collect cycle.
-            Defaults to 1.
+        srv_url (str, optional): URL address of the server, handling JSON
+            data. Can be omitted, if devices are given.
+        interval (float, optional): Interval between each fetch-collect
+            cycle. Defaults to 1.
+        devices (list[Device], optional): Devices to poll concurrently, each
+            with its own interval. Defaults to None.
+        max_concurrency (int, optional): Maximum number of requests sent to
+            the devices at the same time, by each worker. Defaults to 64.
+        batch_size (int, optional): Number of points written to the database
+            in a single request. Defaults to 1.
+        flush_interval (float, optional): Maximum time, in seconds, points
+            are buffered before being written. Defaults to 1.
+        queue_size (int, optional): Number of fetched readings waiting to be
+            stored. Defaults to 1000.
+        backpressure (str, optional): What to do with new readings, when
+            the queue is full: 'block', 'drop-oldest' or 'spill'.
+            Defaults to 'block'.
+        spill_path (str, optional): File readings overflow into with the
+            'spill' policy, suffixed with the worker number if there are more
+            workers. Defaults to a temporary file.
+        store_workers (int, optional): Number of coroutines storing the
+            readings. Defaults to 4.
+        spool_dir (str, optional): Directory to spool points, which could not
+            be written, and replay them later from. With more workers, each
+            one uses its own worker-N subdirectory. Defaults to None.
+        spool_max_bytes (int, optional): Maximum size of the spool on the
+            disk. Defaults to 1 GiB.
+        aggregation (str, optional): How readings of a parameter measured by
+            multiple sensors are combined: 'mean', 'median' or 'priority'.
+            Defaults to 'mean'.
+        failure_threshold (int, optional): Number of consecutive failed
+            requests, after which the device is only probed. Defaults to 5.
+        max_backoff (float, optional): Upper bound of the delay after a
+            failed request, in seconds. Defaults to 300.
+        probe_interval (float, optional): Time between the probes of a
+            failing device, in seconds. Defaults to 60.
+        adaptive_interval (bool, optional): Whether to poll devices less
+            often while their readings do not change. Defaults to False.
+        stages (list, optional): Stages the parsed records pass through
+            before being written, e.g. DeadbandFilter. Every worker process
+            works on its own copy of the stages. Defaults to None.
+        workers (int, optional): Number of worker processes. Defaults to 1.
+        restart_delay (float, optional): Time, in seconds, before a crashed
+            worker is restarted. Defaults to 1.
+
+    Polling a fleet of devices from a single process:
+
+        devices = [
+            Device('http://192.168.1.100/circumstances'),
+            Device('http://192.168.1.101/circumstances', interval=5),
+        ]
+        daemon = DataDaemon(sensors, db_url, token, org, bucket,
+                            devices=devices)
+
+    Spreading thousands of devices over every core:
+
+        daemon = DataDaemon(sensors, db_url, token, org, bucket,
+                            devices=devices, workers=os.cpu_count())
     """
 
+    # statistics summed over the workers
+    COUNTERS = ('queued', 'dropped', 'spilled', 'buffered', 'spooled')
+
     def __init__(
         self,
         sensors: dict[str, list[str]],
@@ -33,12 +102,47 @@ class DataDaemon:
         db_token: str,
         db_org: str,
         db_bucket: str,
-        srv_url: str,
-        interval: int = 1,
+        srv_url: str | None = None,
+        interval: float = 1,
+        devices: list[Device] | None = None,
+        max_concurrency: int = 64,
+        batch_size: int = 1,
+        flush_interval: float = 1,
+        queue_size: int = 1000,
+        backpressure: str = 'block',
+        spill_path: str | None = None,
+        store_workers: int = 4,
+        spool_dir: str | None = None,
+        spool_max_bytes: int = 1024**3,
+        aggregation: str = 'mean',
+        failure_threshold: int = 5,
+        max_backoff: float = 300,
+        probe_interval: float = 60,
+        adaptive_interval: bool = False,
+        stages: list | None = None,
+        workers: int = 1,
+        restart_delay: float = 1,
     ):
         self.sensors = sensors
         self.interval = interval
 
+        self.devices = list(devices) if devices is not None else []
+        if srv_url is not None:
+            self.devices.insert(0, Device(srv_url, self.interval))
+        if not self.devices:
+            raise ValueError('DataDaemon requires srv_url or devices.')
+
+        self.max_concurrency = max_concurrency
+
+        if backpressure not in ReadingQueue.POLICIES:
+            raise ValueError(f'Unknown backpressure policy {backpressure!r}.')
+        if workers < 1:
+            raise ValueError('DataDaemon requires at least one worker.')
+
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.restarts = 0
+
         self._db_url = db_url
         self._token = db_token
         self._org = db_org
@@ -46,58 +150,321 @@ class DataDaemon:
 
         self._srv_url = srv_url
 
-        self._fetcher = AsyncFetcher(self._srv_url)
-        self._collector = AsyncCollector(
-            self.sensors,
-            self._db_url,
-            self._token,
-            self._org,
-            self._bucket,
-        )
+        # assign the devices to the workers
+        self._ring = HashRing(range(self.workers))
+        shards: list[list[Device]] = [[] for _ in range(self.workers)]
+        for device in self.devices:
+            shards[self._ring.node(device.url)].append(device)
+
+        self._workers = [
+            DaemonWorker(
+                self.sensors,
+                self._db_url,
+                self._token,
+                self._org,
+                self._bucket,
+                shard,
+                max_concurrency=self.max_concurrency,
+                batch_size=batch_size,
+                flush_interval=flush_interval,
+                queue_size=queue_size,
+                backpressure=backpressure,
+                spill_path=(
+                    f'{spill_path}.{i}'
+                    if spill_path is not None and self.workers > 1
+                    else spill_path
+                ),
+                store_workers=store_workers,
+                spool_dir=(
+                    os.path.join(spool_dir, f'worker-{i}')
+                    if spool_dir is not None and self.workers > 1
+                    else spool_dir
+                ),
+                spool_max_bytes=spool_max_bytes,
+                aggregation=aggregation,
+                failure_threshold=failure_threshold,
+                max_backoff=max_backoff,
+                probe_interval=probe_interval,
+                adaptive_interval=adaptive_interval,
+                stages=stages,
+            )
+            for i, shard in enumerate(shards)
+        ]
+
+        # worker processes and parent ends of their control channels
+        self._processes: list[multiprocessing.Process | None]
+        self._processes = [None] * self.workers
+        self._controls: list[Connection | None] = [None] * self.workers
+        self._control_lock = threading.Lock()
+
+        # threads receiving the replies of the workers, which resolve the
+        # pending requests, so nothing is locked while waiting for a reply
+        self._readers: list[threading.Thread | None] = [None] * self.workers
+        self._requests = itertools.count()
+        self._pending: dict[int, tuple[Connection, futures.Future]] = {}
+        self._listening: set[Connection] = set()
+        self._pending_lock = threading.Lock()
+
+        self._stopping = threading.Event()
+        self._supervisor: threading.Thread | None = None
 
-        def _daemon_coroutine():
-            """Helper method to send asyncio coroutine to another process."""
+    def _run_worker(self, i: int, control: Connection, channel: Connection):
+        """Helper method, runs the worker within its process."""
 
-            # TODO: Create a proper process queue for this process and ensure
-            # elegant shutdown of the coroutine along with maintaining results.
-            asyncio.run(self._schedule_daemon())
+        # parent ends of the control channels are inherited on fork, the
+        # worker notices the parent exiting only once all of them are closed
+        control.close()
+        for other in self._controls:
+            if other is not None:
+                other.close()
 
-        self._data_daemon = multiprocessing.Process(
-            target=_daemon_coroutine, name='data-daemon'
+        self._workers[i].run(channel)
+
+    def _start_worker(self, i: int):
+        """Start the process of the worker along with its control channel.
+
+        Args:
+            i (int): Number of the worker.
+        """
+        control, channel = multiprocessing.Pipe()
+
+        process = multiprocessing.Process(
+            target=self._run_worker,
+            args=(i, control, channel),
+            name=f'data-daemon-{i}',
         )
+        process.start()
+        channel.close()
+
+        self._processes[i] = process
+        self._controls[i] = control
+
+        self._listening.add(control)
+        self._readers[i] = threading.Thread(
+            target=self._read_replies,
+            args=(control,),
+            name=f'data-daemon-{i}-replies',
+            daemon=True,
+        )
+        self._readers[i].start()
+
+    def _stop_worker(self, i: int):
+        """Helper method, releases the channel of the exited worker."""
+        # reader receives EOF once the process exits
+        self._readers[i].join()
+        self._controls[i].close()
 
-    async def _fetch_to_db(self):
-        """Request sensor readings and store the ones selected in the sensors
-        dictionary."""
-        json = await self._fetcher.request_readings()
-        await self._collector.store_readings(json)
+        self._processes[i] = None
+        self._controls[i] = None
+        self._readers[i] = None
 
-    async def _background_loop(self):
-        """Start main loop of the daemon.
+    def _resolve(self, request: int, reply: dict | None):
+        """Helper method, completes the pending request with the reply."""
+        with self._pending_lock:
+            pending = self._pending.pop(request, None)
+        if pending is not None:
+            pending[1].set_result(reply)
 
-        Regulates the interval between each cycle in the infinite loop.
+    def _read_replies(self, control: Connection):
+        """Receive replies of the worker until its channel closes.
+
+        Args:
+            control (Connection): Parent end of the control channel.
         """
         while True:
-            await asyncio.sleep(self.interval)
-            await self._fetch_to_db()
+            try:
+                request, reply = control.recv()
+            except (EOFError, OSError):
+                break
+            self._resolve(request, reply)
+
+        # worker exited, requests it did not answer never will be
+        with self._pending_lock:
+            self._listening.discard(control)
+            unanswered = [
+                request
+                for request, (owner, _) in self._pending.items()
+                if owner is control
+            ]
+        for request in unanswered:
+            self._resolve(request, None)
+
+    def _supervise(self):
+        """Restart workers, which exited without being stopped."""
+        while not self._stopping.is_set():
+            sentinels = {
+                process.sentinel: i
+                for i, process in enumerate(self._processes)
+                if process is not None
+            }
+            for sentinel in wait(list(sentinels), timeout=1):
+                if self._stopping.is_set():
+                    return
+
+                i = sentinels[sentinel]
+                self._processes[i].join()
+                print(
+                    f'Worker {i} of the data daemon exited with code '
+                    f'{self._processes[i].exitcode}, restarting'
+                )
+
+                if self._stopping.wait(self.restart_delay):
+                    return
+                with self._control_lock:
+                    if not self._stopping.is_set():
+                        self._stop_worker(i)
+                        self._start_worker(i)
+                        self.restarts += 1
+
+    def _broadcast(
+        self, command: str, timeout: float | None
+    ) -> list[dict | None]:
+        """Send the command to every worker and wait for the replies.
+
+        Channels are locked only while sending, so the supervisor and other
+        commands are not blocked by a worker slow to reply.
 
-    async def _schedule_daemon(self):
-        """Schedule the background loop coroutine."""
-        async with asyncio.TaskGroup() as tg:
-            await tg.create_task(self._background_loop())
+        Args:
+            command (str): Command to send.
+            timeout (float | None): Time, in seconds, to wait for all the
+                replies.
+
+        Returns:
+            list[dict | None]: Reply of every worker, None if it is not
+                running or did not reply in time.
+        """
+        requests = []
+        with self._control_lock:
+            for process, control in zip(self._processes, self._controls):
+                request = next(self._requests)
+                future = futures.Future()
+                requests.append((request, future))
+
+                with self._pending_lock:
+                    if (
+                        process is not None
+                        and process.is_alive()
+                        and control in self._listening
+                    ):
+                        self._pending[request] = (control, future)
+                    else:
+                        future.set_result(None)
+                        continue
+
+                try:
+                    control.send((request, command))
+                except OSError:
+                    self._resolve(request, None)
+
+        futures.wait([future for _, future in requests], timeout)
+
+        # late replies are discarded
+        for request, _ in requests:
+            self._resolve(request, None)
+        return [future.result() for _, future in requests]
+
+    def _merge(self, replies: list[dict | None]) -> dict | None:
+        """Helper function, combines statistics of the workers."""
+        replies = [reply for reply in replies if reply is not None]
+        if not replies:
+            return None
+
+        status = {'devices': {}, **{key: 0 for key in self.COUNTERS}}
+        for reply in replies:
+            status['devices'].update(reply['devices'])
+            for key in self.COUNTERS:
+                status[key] += reply[key]
+
+        status['workers'] = len(replies)
+        status['restarts'] = self.restarts
+        return status
+
+    def status(self, timeout: float | None = 5) -> dict | None:
+        """Query statistics of the running daemon.
+
+        Args:
+            timeout (float, optional): Time, in seconds, to wait for the
+                reply. Defaults to 5.
+
+        Returns:
+            dict | None: Ticks and missed ticks of every device, number of
+                queued, dropped and spilled readings, buffered points and
+                size of the spool, summed over the workers, along with the
+                number of workers which replied and of restarts. None, if
+                the daemon is not running or did not reply in time.
+        """
+        return self._merge(self._broadcast('status', timeout))
+
+    def flush(self, timeout: float | None = None) -> dict | None:
+        """Store every queued reading and write every buffered point.
+
+        Args:
+            timeout (float, optional): Time, in seconds, to wait for the
+                flush to complete. Defaults to None, meaning no limit.
+
+        Returns:
+            dict | None: Status of the daemon after the flush. None, if the
+                daemon is not running or did not reply in time.
+        """
+        return self._merge(self._broadcast('flush', timeout))
 
     def enable(self):
         """Enable the daemon.
 
-        Data daemon process will start in another process and start requesting
-        readings from the server (srv_* attributes) with specified interval.
+        Worker processes will start and request readings from every device
+        with its specified interval.
 
         Data is then decorated, parsed and stored as InfluxDB-compatible
         records.
         """
-        self._data_daemon.start()
+        if self._supervisor is not None:
+            return
+
+        self._stopping.clear()
+        with self._control_lock:
+            for i in range(self.workers):
+                self._start_worker(i)
+
+        self._supervisor = threading.Thread(
+            target=self._supervise, name='data-daemon-supervisor', daemon=True
+        )
+        self._supervisor.start()
+
+    def disable(self, timeout: float | None = 30) -> dict | None:
+        """Disable the daemon.
+
+        Workers stop polling, store the queued readings and write the
+        buffered points before exiting. Workers, which do not exit within
+        the timeout, are terminated.
+
+        Args:
+            timeout (float, optional): Time, in seconds, to wait for the
+                graceful shutdown. Defaults to 30.
+
+        Returns:
+            dict | None: Final status of the daemon. None, if the daemon was
+                not running or had to be terminated.
+        """
+        if self._supervisor is None:
+            return None
+
+        self._stopping.set()
+        self._supervisor.join()
+        self._supervisor = None
+
+        replies = self._broadcast('stop', timeout)
+
+        for i, (process, reply) in enumerate(zip(self._processes, replies)):
+            # without the reply the worker is stuck, no point in waiting
+            process.join(timeout if reply is not None else 0)
+            if process.is_alive():
+                print(
+                    f'Worker {i} of the data daemon did not stop within '
+                    f'{timeout}s, terminating'
+                )
+                process.terminate()
+                process.join()
+
+            self._stop_worker(i)
 
-    def disable(self):
-        """Disable the daemon."""
-        self._data_daemon.terminate()
-        self._data_daemon.join()
+        return self._merge(replies)
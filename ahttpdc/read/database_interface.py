@@ -5,14 +5,26 @@ Manages appropriate objects and provides an interface for the user to utilise.
 Author: Piotr Krzysztof Lis - github.com/straightchlorine
 """
 
+from concurrent.futures import Future
+import threading
+from typing import AsyncIterator, Coroutine, Iterator, TypeVar
+
 import pandas as pd
 import asyncio
 
 from ahttpdc.read.daemon import DataDaemon
+from ahttpdc.read.device import Device
 from ahttpdc.read.query.interface import AsyncQuery
 
 __all__ = ['DatabaseInterface']
 
+T = TypeVar('T')
+
+
+async def _next(stream: AsyncIterator[T]) -> T:
+    """Helper function, wraps the next item of the stream in a coroutine."""
+    return await stream.__anext__()
+
 
 class DatabaseInterface:
     """Control data-daemon and querying data.
@@ -26,6 +38,20 @@ class DatabaseInterface:
         interface = DatabaseInterface(args)
         interface.daemon.enable()
 
+    Queries run on an event loop owned by the interface, in a background
+    thread started with the first query. Regular methods block until the
+    result is ready and can be called from any thread, while their
+    counterparts prefixed with 'a' can be awaited within any event loop:
+
+        df = interface.query_latest()
+        df = await interface.aquery_latest()
+
+    Queries share long-lived database clients, which are released along
+    with the loop by close() or by using the interface as a context manager:
+
+        with DatabaseInterface(args) as interface:
+            df = interface.query_latest()
+
     Args:
         sensors (dict): The sensors and their parameters to read.
         db_host (str): The host of the InfluxDB instance.
@@ -33,13 +59,24 @@ class DatabaseInterface:
         db_token (str): The token to authenticate with InfluxDB.
         db_org (str): The organization to use within InfluxDB.
         db_bucket (str): Bucket within InfluxDB where the data will be stored.
-        srv_ip (str): The port of the device providing the readings.
+        srv_ip (str, optional): The port of the device providing the
+            readings. Can be omitted, if devices are given.
         srv_port (str, optional): The http handle to access the data.
             Defaults to 8000.
         handle (str, optional): The address of the device in the network.
             Defaults to ''.
-        interval(int, optional): Interval between fetch-collect cycle.
+        interval(float, optional): Interval between fetch-collect cycle.
             Defaults to 1.
+        devices (list[Device], optional): Additional devices to poll
+            concurrently by the daemon. Defaults to None.
+        max_concurrency (int, optional): Maximum number of requests the
+            daemon sends at the same time. Defaults to 64.
+        device_tags (list[str], optional): Names of the devices to query, as
+            given in their JSON responses. Defaults to every device.
+        cache_ttl (float, optional): Lifetime, in seconds, of the cached
+            results of historical queries. Defaults to None (no cache).
+        **daemon_options: Further keyword arguments passed to the DataDaemon,
+            e.g. batch_size and flush_interval.
     """
 
     def __init__(
@@ -50,10 +87,15 @@ class DatabaseInterface:
         db_token: str,
         db_org: str,
         db_bucket: str,
-        srv_ip: str,
+        srv_ip: str | None = None,
         srv_port: int | str = 80,
         handle: str = '',
-        interval: int = 1,
+        interval: float = 1,
+        devices: list[Device] | None = None,
+        max_concurrency: int = 64,
+        device_tags: list[str] | None = None,
+        cache_ttl: float | None = None,
+        **daemon_options,
     ):
         self._sensors = sensors
 
@@ -68,9 +110,14 @@ class DatabaseInterface:
         self._ip = srv_ip
         self._port = srv_port
         self._handle = handle
-        self._srv_url = f'http://{self._ip}:{self._port}/{self._handle}'
+        self._srv_url = (
+            f'http://{self._ip}:{self._port}/{self._handle}'
+            if self._ip is not None
+            else None
+        )
 
         self._interval = interval
+        self._devices = devices
 
         self.daemon = DataDaemon(
             self._sensors,
@@ -80,6 +127,9 @@ class DatabaseInterface:
             self._db_bucket,
             self._srv_url,
             self._interval,
+            self._devices,
+            max_concurrency,
+            **daemon_options,
         )
 
         # query object
@@ -89,17 +139,77 @@ class DatabaseInterface:
             self._db_token,
             self._db_org,
             self._db_bucket,
+            device_tags,
+            cache_ttl,
         )
 
+        # event loop running the queries, started on first use
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: threading.Thread | None = None
+        self._loop_lock = threading.Lock()
+
+    def __enter__(self) -> 'DatabaseInterface':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _submit(self, coroutine: Coroutine[None, None, T]) -> Future[T]:
+        """Schedule the coroutine on the loop of the interface.
+
+        Starts the loop in a background thread, if it is not running yet.
+        Safe to call from any thread.
+
+        Args:
+            coroutine (Coroutine): Coroutine to run.
+
+        Returns:
+            Future: Future of the result of the coroutine.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name='ahttpdc-query-loop',
+                    daemon=True,
+                )
+                self._loop_thread.start()
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def _run(self, coroutine: Coroutine[None, None, T]) -> T:
+        """Run the coroutine on the loop of the interface and wait for the
+        result."""
+        return self._submit(coroutine).result()
+
+    async def _await(self, coroutine: Coroutine[None, None, T]) -> T:
+        """Run the coroutine on the loop of the interface and await the
+        result within the current loop."""
+        return await asyncio.wrap_future(self._submit(coroutine))
+
+    def close(self):
+        """Close the database clients shared by the queries and stop the
+        loop running them."""
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop, self._loop_thread = None, None
+
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._query.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
     def query_latest(self) -> pd.DataFrame:
         """Query the latest measurement from InfluxDB.
 
         Returns:
             pd.DataFrame: The latest measurement.
         """
-        loop = asyncio.get_event_loop()
-        task = asyncio.create_task(self._query.latest())
-        return loop.run_until_complete(task)
+        return self._run(self._query.latest())
 
     def query_historical(
         self, start_relative: str, end: str = ''
@@ -122,11 +232,143 @@ class DatabaseInterface:
             * relative relative:
                 query_historical('-30d')
         """
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(
-            self._query.historical(start_relative, end)
+        return self._run(self._query.historical(start_relative, end))
+
+    def query_historical_sharded(
+        self,
+        start_relative: str,
+        end: str = '',
+        shards: int = 4,
+        max_concurrency: int | None = None,
+    ) -> pd.DataFrame:
+        """Query historical data split into time shards queried in parallel.
+
+        Args:
+            start_relative (str): Start of the time interval or a relative
+                interval.
+            end (str, optional): End of the time interval. Defaults to ''
+            shards (int, optional): Number of the shards. Defaults to 4.
+            max_concurrency (int, optional): Maximum number of shards queried
+                at the same time. Defaults to every shard.
+
+        Returns:
+            pd.DataFrame: Data from selected time interval.
+
+        Examples:
+            query_historical_sharded('-90d', shards=9)
+        """
+        return self._run(
+            self._query.historical_sharded(
+                start_relative, end, shards, max_concurrency
+            )
         )
 
+    def query_historical_stream(
+        self, start_relative: str, end: str = '', chunk_size: int = 10000
+    ) -> Iterator[pd.DataFrame]:
+        """Stream historical data from the database in chunks.
+
+        Only a single chunk is kept in memory at a time, so even months of
+        data can be processed.
+
+        Args:
+            start_relative (str): Start of the time interval or a relative
+                interval.
+            end (str, optional): End of the time interval. Defaults to ''
+            chunk_size (int, optional): Maximum number of rows within a
+                single chunk. Defaults to 10000.
+
+        Yields:
+            pd.DataFrame: Consecutive, time-ordered chunks of the data.
+
+        Examples:
+            for chunk in query_historical_stream('-90d'):
+                process(chunk)
+        """
+        stream = self._query.historical_stream(start_relative, end, chunk_size)
+        try:
+            while True:
+                try:
+                    yield self._run(_next(stream))
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(stream.aclose())
+
+    def query_aggregated(
+        self,
+        start_relative: str,
+        end: str = '',
+        window: str = '1m',
+        fn: str = 'mean',
+        sensors: list[str] | None = None,
+        fields: list[str] | None = None,
+        percentile: float = 95,
+    ) -> pd.DataFrame:
+        """Query data aggregated into time windows by the database.
+
+        Args:
+            start_relative (str): Start of the time interval or a relative
+                interval.
+            end (str, optional): End of the time interval. Defaults to ''
+            window (str, optional): Duration of a single window.
+                Defaults to '1m'.
+            fn (str, optional): Aggregate function, one of: mean, min, max,
+                last, median, percentile. Defaults to 'mean'.
+            sensors (list[str], optional): Sensors, which parameters to
+                query. Defaults to every sensor.
+            fields (list[str], optional): Parameters to query. Overrides
+                sensors. Defaults to None.
+            percentile (float, optional): Percentile computed by the
+                percentile function. Defaults to 95.
+
+        Returns:
+            pd.DataFrame: A row per window and a column per parameter.
+
+        Examples:
+            * hourly means of the last 30 days:
+                query_aggregated('-30d', window='1h')
+            * daily 99th percentile of CO2:
+                query_aggregated('-30d', window='1d', fn='percentile',
+                    fields=['co2'], percentile=99)
+        """
+        return self._run(
+            self._query.aggregated(
+                start_relative,
+                end,
+                window,
+                fn,
+                sensors,
+                fields,
+                percentile,
+            )
+        )
+
+    def query_tail(
+        self,
+        subscriber: str = 'default',
+        start: str = '-1h',
+        grace: float = 60,
+    ) -> pd.DataFrame:
+        """Query the rows newer than the ones already returned to the
+        subscriber.
+
+        Live views can poll it to get only new rows, instead of the whole
+        window on every refresh.
+
+        Args:
+            subscriber (str, optional): Name of the subscriber, each one has
+                its own cursor. Defaults to 'default'.
+            start (str, optional): Start of the time interval of the first
+                query of the subscriber. Defaults to '-1h'.
+            grace (float, optional): Time, in seconds, rows may arrive late
+                and still be returned. Defaults to 60.
+
+        Returns:
+            pd.DataFrame: Rows, which have not been returned yet.
+        """
+        return self._run(self._query.tail(subscriber, start, grace))
+
     def query_custom_async(self, query: str) -> pd.DataFrame:
         """Perform a custom asynchronous query on the database.
 
@@ -139,9 +381,7 @@ class DatabaseInterface:
         Returns:
             pd.DataFrame: Response to the query.
         """
-        loop = asyncio.get_event_loop()
-        task = asyncio.create_task(self._query.custom_async(query))
-        return loop.run_until_complete(task)
+        return self._run(self._query.custom_async(query))
 
     def query_custom_sync(self, query: str) -> pd.DataFrame:
         """Perform a custom synchronous query on the database.
@@ -154,6 +394,82 @@ class DatabaseInterface:
         Returns:
             pd.DataFrame: Response to the query.
         """
-        loop = asyncio.get_event_loop()
-        task = asyncio.create_task(self._query.custom_sync(query))
-        return loop.run_until_complete(task)
+        return self._run(self._query.custom_sync(query))
+
+    async def aquery_latest(self) -> pd.DataFrame:
+        """Awaitable counterpart of query_latest()."""
+        return await self._await(self._query.latest())
+
+    async def aquery_historical(
+        self, start_relative: str, end: str = ''
+    ) -> pd.DataFrame:
+        """Awaitable counterpart of query_historical()."""
+        return await self._await(self._query.historical(start_relative, end))
+
+    async def aquery_historical_sharded(
+        self,
+        start_relative: str,
+        end: str = '',
+        shards: int = 4,
+        max_concurrency: int | None = None,
+    ) -> pd.DataFrame:
+        """Awaitable counterpart of query_historical_sharded()."""
+        return await self._await(
+            self._query.historical_sharded(
+                start_relative, end, shards, max_concurrency
+            )
+        )
+
+    async def aquery_historical_stream(
+        self, start_relative: str, end: str = '', chunk_size: int = 10000
+    ) -> AsyncIterator[pd.DataFrame]:
+        """Asynchronous counterpart of query_historical_stream()."""
+        stream = self._query.historical_stream(start_relative, end, chunk_size)
+        try:
+            while True:
+                try:
+                    yield await self._await(_next(stream))
+                except StopAsyncIteration:
+                    return
+        finally:
+            await self._await(stream.aclose())
+
+    async def aquery_aggregated(
+        self,
+        start_relative: str,
+        end: str = '',
+        window: str = '1m',
+        fn: str = 'mean',
+        sensors: list[str] | None = None,
+        fields: list[str] | None = None,
+        percentile: float = 95,
+    ) -> pd.DataFrame:
+        """Awaitable counterpart of query_aggregated()."""
+        return await self._await(
+            self._query.aggregated(
+                start_relative,
+                end,
+                window,
+                fn,
+                sensors,
+                fields,
+                percentile,
+            )
+        )
+
+    async def aquery_tail(
+        self,
+        subscriber: str = 'default',
+        start: str = '-1h',
+        grace: float = 60,
+    ) -> pd.DataFrame:
+        """Awaitable counterpart of query_tail()."""
+        return await self._await(self._query.tail(subscriber, start, grace))
+
+    async def aquery_custom_async(self, query: str) -> pd.DataFrame:
+        """Awaitable counterpart of query_custom_async()."""
+        return await self._await(self._query.custom_async(query))
+
+    async def aquery_custom_sync(self, query: str) -> pd.DataFrame:
+        """Awaitable counterpart of query_custom_sync()."""
+        return await self._await(self._query.custom_sync(query))
@@ -0,0 +1,39 @@
+"""Description of a single device polled by the data daemon.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+__all__ = ['Device']
+
+
+class Device:
+    """Device providing JSON readings over HTTP.
+
+    Args:
+        url (str): URL address of the device with data.
+        interval (float, optional): Interval between each fetch-collect cycle
+            for this device. Defaults to 1.
+        name (str, optional): Name used in the daemon messages. Defaults to
+            the URL of the device.
+        phase (float, optional): Delay of the first request, in seconds, to
+            spread the requests of many devices. Defaults to 0.
+        jitter (float, optional): Upper bound of a random delay added to
+            every request, in seconds. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        interval: float = 1,
+        name: str | None = None,
+        phase: float = 0,
+        jitter: float = 0,
+    ) -> None:
+        self.url = url
+        self.interval = interval
+        self.name = name if name is not None else url
+        self.phase = phase
+        self.jitter = jitter
+
+    def __repr__(self) -> str:
+        return f'Device({self.url!r}, interval={self.interval!r})'
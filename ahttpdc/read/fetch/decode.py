@@ -0,0 +1,138 @@
+"""Decode and validate JSON responses of the devices.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import json
+from typing import Any, Callable
+
+__all__ = ['InvalidPayload', 'PayloadDecoder']
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class InvalidPayload(ValueError):
+    """Raised when the response of the device cannot be processed."""
+
+    pass
+
+
+class PayloadDecoder:
+    """Decode JSON responses and check if they contain selected readings.
+
+    The fastest available backend is used: msgspec, orjson or the standard
+    library json module. Required readings are compiled from the sensors
+    dictionary once, then each payload is checked while its values are
+    converted to floats, so malformed responses are rejected before they
+    reach the parser.
+
+    Args:
+        sensors (dict[str, list[str]], optional): Readings the payload has to
+            contain. Defaults to None, meaning only the structure is checked.
+        backend (str, optional): One of 'msgspec', 'orjson' or 'json'.
+            Defaults to the fastest one installed.
+    """
+
+    BACKENDS = ('msgspec', 'orjson', 'json')
+
+    def __init__(
+        self,
+        sensors: dict[str, list[str]] | None = None,
+        backend: str | None = None,
+    ) -> None:
+        self.backend = backend if backend is not None else self._detect()
+        self._loads = self._loader(self.backend)
+
+        # (sensor, parameters) pairs, the payload has to contain
+        self._schema: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+            (sensor, tuple(dict.fromkeys(params)))
+            for sensor, params in (sensors or {}).items()
+        )
+
+    @staticmethod
+    def _detect() -> str:
+        """Helper function, picks the fastest backend installed."""
+        if msgspec is not None:
+            return 'msgspec'
+        if orjson is not None:
+            return 'orjson'
+        return 'json'
+
+    @staticmethod
+    def _loader(backend: str) -> Callable[[bytes], Any]:
+        """Helper function, provides the decoding function of the backend."""
+        if backend == 'msgspec':
+            if msgspec is None:
+                raise ImportError('msgspec backend requires msgspec.')
+            # untyped, devices may report extra keys next to the sensors,
+            # the structure is validated by decode()
+            return msgspec.json.Decoder().decode
+        if backend == 'orjson':
+            if orjson is None:
+                raise ImportError('orjson backend requires orjson.')
+            return orjson.loads
+        if backend == 'json':
+            return json.loads
+
+        raise ValueError(
+            f'Unknown backend {backend!r}, '
+            f'expected one of {PayloadDecoder.BACKENDS}.'
+        )
+
+    def decode(self, data: bytes) -> dict:
+        """Decode the payload and validate it against the schema.
+
+        Required readings are converted to floats in place.
+
+        Args:
+            data (bytes): Body of the response.
+
+        Returns:
+            dict: Decoded JSON response.
+
+        Raises:
+            InvalidPayload: If the payload is not JSON of required structure.
+        """
+        try:
+            payload = self._loads(data)
+        except (ValueError, TypeError) as e:
+            raise InvalidPayload(f'Malformed JSON response: {e}') from e
+
+        if not isinstance(payload, dict) or len(payload) != 1:
+            raise InvalidPayload(
+                'Response has to contain a single device as the top-level key.'
+            )
+
+        device, readings = next(iter(payload.items()))
+        if not isinstance(readings, dict):
+            raise InvalidPayload(f'Readings of {device!r} are not an object.')
+
+        for sensor, params in self._schema:
+            values = readings.get(sensor)
+            if not isinstance(values, dict):
+                raise InvalidPayload(
+                    f'{device!r} is missing sensor {sensor!r}.'
+                )
+
+            for param in params:
+                try:
+                    values[param] = float(values[param])
+                except KeyError:
+                    raise InvalidPayload(
+                        f'{device!r} is missing {sensor}.{param} reading.'
+                    ) from None
+                except (ValueError, TypeError):
+                    raise InvalidPayload(
+                        f'{device!r} sent invalid {sensor}.{param} reading: '
+                        f'{values[param]!r}.'
+                    ) from None
+
+        return payload
@@ -5,6 +5,9 @@ Author: Piotr Krzysztof Lis - github.com/straightchlorine
 
 import aiohttp
 
+from ahttpdc.read.fetch.decode import PayloadDecoder
+from ahttpdc.read.fetch.reading import MonotonicClock, Reading
+
 
 __all__ = ['AsyncFetcher']
 
@@ -40,27 +43,163 @@ class AsyncFetcher:
     }
 
 
+    Requests share a single, pooled session with keep-alive connections when
+    the fetcher is opened, either explicitly or as an async context manager:
+
+        async with AsyncFetcher(url) as fetcher:
+            readings = await fetcher.request_readings()
+
+    Otherwise, every request creates and closes its own session.
+
     Args:
-        url (str): URL address of the device with data.
+        url (str, optional): URL address of the device with data. Can be
+            omitted, if the URL is passed with each request.
+        limit (int, optional): Maximum number of simultaneous connections.
+            Defaults to 100.
+        limit_per_host (int, optional): Maximum number of simultaneous
+            connections to a single device. Defaults to 2.
+        dns_cache_ttl (int, optional): How long, in seconds, resolved
+            addresses are cached. Defaults to 300.
+        keepalive_timeout (float, optional): How long, in seconds, an idle
+            connection is kept open. Defaults to 30.
+        timeout (float, optional): Total timeout of a single request, in
+            seconds. Defaults to 5.
+        connect_timeout (float, optional): Timeout of establishing the
+            connection, in seconds. Defaults to 2.
+        sensors (dict[str, list[str]], optional): Readings every response
+            has to contain. Responses without them raise InvalidPayload.
+            Defaults to None.
+        decoder (PayloadDecoder, optional): Decoder of the responses.
+            Defaults to a PayloadDecoder of the sensors, using the fastest
+            JSON library installed.
+        clock (MonotonicClock, optional): Clock the readings are stamped
+            with. Defaults to a new MonotonicClock.
     """
 
-    def __init__(self, url):
+    def __init__(
+        self,
+        url: str | None = None,
+        limit: int = 100,
+        limit_per_host: int = 2,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+        timeout: float = 5,
+        connect_timeout: float = 2,
+        sensors: dict[str, list[str]] | None = None,
+        decoder: PayloadDecoder | None = None,
+        clock: MonotonicClock | None = None,
+    ):
         self._url = url
+        self._decoder = (
+            decoder if decoder is not None else PayloadDecoder(sensors)
+        )
+        self._clock = clock if clock is not None else MonotonicClock()
+
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._dns_cache_ttl = dns_cache_ttl
+        self._keepalive_timeout = keepalive_timeout
+        self._timeout = aiohttp.ClientTimeout(
+            total=timeout, connect=connect_timeout
+        )
+
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> 'AsyncFetcher':
+        await self.open()
+        return self
 
-    async def request_readings(self):
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Helper function, provides session with a configured connector."""
+
+        connector = aiohttp.TCPConnector(
+            limit=self._limit,
+            limit_per_host=self._limit_per_host,
+            ttl_dns_cache=self._dns_cache_ttl,
+            keepalive_timeout=self._keepalive_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector, timeout=self._timeout
+        )
+
+    async def open(self):
+        """Open the shared session, used by every subsequent request."""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+
+    async def close(self):
+        """Close the shared session along with its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request_readings(self, url: str | None = None):
         """Request JSON response from the server.
 
+        Args:
+            url (str, optional): URL address of the device to request the
+                readings from. Defaults to the URL given to the fetcher.
 
         Returns:
             dict: JSON response from the device.
+
+        Raises:
+            InvalidPayload: If the response is malformed or lacks readings
+                selected in the sensors dictionary.
+        """
+        reading = await self.capture(url)
+        if reading is not None:
+            return reading.payload
+
+    async def capture(self, url: str | None = None) -> Reading | None:
+        """Request JSON response from the server, along with its timing.
+
+        Time the request was sent and the response arrived is measured on
+        the monotonic clock, so the readings can be stamped with the time
+        they were taken rather than the time they were processed.
+
+        Args:
+            url (str, optional): URL address of the device to request the
+                readings from. Defaults to the URL given to the fetcher.
+
+        Returns:
+            Reading | None: Response from the device or None, if the
+                request failed.
+
+        Raises:
+            InvalidPayload: If the response is malformed or lacks readings
+                selected in the sensors dictionary.
+        """
+        url = self._url if url is None else url
+        if self._session is not None:
+            return await self._request(self._session, url)
+
+        async with self._create_session() as session:
+            return await self._request(session, url)
+
+    async def _request(
+        self, session: aiohttp.ClientSession, url: str
+    ) -> Reading | None:
+        """Send the request using given session.
+
+        Args:
+            session (aiohttp.ClientSession): Session to send the request with.
+            url (str): URL address of the device.
+
+        Returns:
+            Reading | None: Response from the device or None, if it
+                responded with an error status. Failures are reported by the
+                caller, which knows the health of the device.
+
+        Raises:
+            InvalidPayload: If the response is malformed.
         """
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self._url) as response:
-                if response.status != 200:
-                    print(f'Error fetching data: {response.status}')
-                else:
-                    # TODO: Add some verification module to check if the JSON response is
-                    # appropriate for further processing.
-
-                    read = await response.json()
-                    return read
+        sent = self._clock.now()
+        async with session.get(url) as response:
+            received = self._clock.now()
+            if response.status == 200:
+                payload = self._decoder.decode(await response.read())
+                return Reading(payload, sent, received)
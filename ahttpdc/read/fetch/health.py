@@ -0,0 +1,157 @@
+"""Health of the polled devices, deciding when they are requested next.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+__all__ = ['DeviceHealth']
+
+
+class DeviceHealth:
+    """Track failures of a device and throttle requests to it accordingly.
+
+    Works as a circuit breaker. While the device responds, the circuit is
+    'closed' and it is polled every interval. After a failure, the next
+    request is delayed exponentially, up to max_backoff. Once
+    failure_threshold consecutive requests fail, the circuit is 'open' and
+    the device is left alone for probe_interval seconds, after which a
+    single 'half-open' probe decides whether it is closed or opened again.
+
+    With adaptive interval, the device is polled less often while its
+    readings do not change, up to max_stretch times the interval.
+
+        health = DeviceHealth(interval=1)
+        if health.ready(now):
+            try:
+                reading = await fetch()
+            except TimeoutError:
+                health.failure(now)
+            else:
+                health.success(now, reading)
+
+    Args:
+        interval (float): Regular interval between the requests, in seconds.
+        failure_threshold (int, optional): Number of consecutive failures
+            opening the circuit. Defaults to 5.
+        backoff (float, optional): Factor the delay grows by with every
+            failure. Defaults to 2.
+        max_backoff (float, optional): Upper bound of the delay after a
+            failure, in seconds. Defaults to 300.
+        probe_interval (float, optional): Time between the probes of a
+            device with open circuit, in seconds. Defaults to 60.
+        adaptive (bool, optional): Whether to poll less often while the
+            readings do not change. Defaults to False.
+        max_stretch (int, optional): Maximum multiple of the interval with
+            adaptive interval. Defaults to 8.
+    """
+
+    STATES = ('closed', 'open', 'half-open')
+
+    def __init__(
+        self,
+        interval: float,
+        failure_threshold: int = 5,
+        backoff: float = 2,
+        max_backoff: float = 300,
+        probe_interval: float = 60,
+        adaptive: bool = False,
+        max_stretch: int = 8,
+    ) -> None:
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.probe_interval = probe_interval
+        self.adaptive = adaptive
+        self.max_stretch = max_stretch
+
+        self.state = 'closed'
+        self.failures = 0
+        self.stretch = 1
+
+        # statistics
+        self.skipped = 0
+
+        self._not_before = float('-inf')
+        self._previous = None
+
+    def _wait(self, now: float, delay: float):
+        """Helper function, postpones the next request by the delay.
+
+        Slightly less than the delay is used, so a tick of the scheduler
+        landing exactly on the deadline is not skipped.
+        """
+        self._not_before = now + delay - self.interval / 2
+
+    def ready(self, now: float) -> bool:
+        """Check if the device should be requested now.
+
+        Open circuit turns half-open, once the probe is due.
+
+        Args:
+            now (float): Current time of the monotonic clock, in seconds.
+
+        Returns:
+            bool: True, if the request should be sent.
+        """
+        if now < self._not_before:
+            self.skipped += 1
+            return False
+
+        if self.state == 'open':
+            self.state = 'half-open'
+        return True
+
+    def success(self, now: float, payload=None) -> bool:
+        """Record a successful request.
+
+        Args:
+            now (float): Time the request was sent, on the monotonic clock,
+                in seconds.
+            payload (Any, optional): Readings of the device, compared with
+                the previous ones with adaptive interval. Defaults to None.
+
+        Returns:
+            bool: True, if the circuit was closed by this request.
+        """
+        recovered = self.state != 'closed'
+        self.state = 'closed'
+        self.failures = 0
+
+        if self.adaptive and payload is not None:
+            if payload == self._previous:
+                self.stretch = min(self.stretch * 2, self.max_stretch)
+            else:
+                self.stretch = 1
+            self._previous = payload
+
+        self._wait(now, self.interval * self.stretch)
+        return recovered
+
+    def failure(self, now: float) -> bool:
+        """Record a failed request.
+
+        Args:
+            now (float): Time the request was sent, on the monotonic clock,
+                in seconds.
+
+        Returns:
+            bool: True, if the circuit of a healthy device was opened by
+                this request.
+        """
+        self.failures += 1
+        self.stretch = 1
+
+        if (
+            self.state == 'half-open'
+            or self.failures >= self.failure_threshold
+        ):
+            opened = self.state == 'closed'
+            self.state = 'open'
+            self._wait(now, self.probe_interval)
+            return opened
+
+        self._wait(
+            now,
+            min(self.interval * self.backoff**self.failures, self.max_backoff),
+        )
+        return False
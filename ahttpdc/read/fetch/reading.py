@@ -0,0 +1,78 @@
+"""Readings stamped with the time they were captured.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import time
+
+__all__ = ['MonotonicClock', 'Reading']
+
+
+class MonotonicClock:
+    """Wall-clock time derived from the monotonic clock.
+
+    Wall-clock time is sampled once and advanced with the monotonic clock,
+    so timestamps are not affected by the system clock being stepped, e.g.
+    by NTP. To follow the slow drift between the clocks, the reference is
+    sampled again every resync_interval seconds.
+
+    Args:
+        resync_interval (float, optional): Time, in seconds, between the
+            samples of the wall-clock time. Defaults to 3600.
+    """
+
+    def __init__(self, resync_interval: float = 3600) -> None:
+        self._resync_ns = int(resync_interval * 1e9)
+        self._resync()
+
+    def _resync(self):
+        """Helper function, samples both clocks as a reference."""
+        self._monotonic = time.monotonic_ns()
+        self._wall = time.time_ns()
+
+    def now(self) -> int:
+        """Current time.
+
+        Returns:
+            int: Time since the epoch, in nanoseconds.
+        """
+        elapsed = time.monotonic_ns() - self._monotonic
+        if elapsed >= self._resync_ns:
+            self._resync()
+            return self._wall
+        return self._wall + elapsed
+
+
+class Reading:
+    """JSON response of a device along with the time it was captured.
+
+    Args:
+        payload (dict): Decoded JSON response.
+        sent (int): Time the request was sent, in nanoseconds since the epoch.
+        received (int): Time the response arrived, in nanoseconds since the
+            epoch.
+    """
+
+    __slots__ = ('payload', 'sent', 'received')
+
+    def __init__(self, payload: dict, sent: int, received: int) -> None:
+        self.payload = payload
+        self.sent = sent
+        self.received = received
+
+    @property
+    def latency(self) -> int:
+        """Round-trip time of the request, in nanoseconds."""
+        return self.received - self.sent
+
+    @property
+    def timestamp(self) -> int:
+        """Time the readings were taken, in milliseconds since the epoch.
+
+        The device samples its sensors while answering, so the midpoint of
+        the request is used.
+        """
+        return (self.sent + self.received) // 2_000_000
+
+    def __repr__(self) -> str:
+        return f'Reading({self.payload!r}, {self.sent!r}, {self.received!r})'
@@ -0,0 +1,213 @@
+"""Bounded queue joining fetching and storing stages of the daemon.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+import os
+import pickle
+import tempfile
+from typing import Any, BinaryIO
+
+__all__ = ['ReadingQueue']
+
+
+class ReadingQueue:
+    """Bounded FIFO queue of readings with a configurable backpressure policy.
+
+    Policies, applied when the queue is full:
+        * block - producer waits until a consumer takes an item,
+        * drop-oldest - the oldest item is discarded to make room,
+        * spill - items overflow into a file on disk and are handed to the
+          consumers, once the queue in memory is empty.
+
+    Args:
+        maxsize (int, optional): Number of items kept in memory.
+            Defaults to 1000.
+        policy (str, optional): Backpressure policy. Defaults to 'block'.
+        spill_path (str, optional): File the items overflow into with the
+            spill policy. Defaults to an anonymous temporary file.
+    """
+
+    POLICIES = ('block', 'drop-oldest', 'spill')
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        policy: str = 'block',
+        spill_path: str | None = None,
+    ) -> None:
+        if policy not in self.POLICIES:
+            raise ValueError(
+                f'Unknown backpressure policy {policy!r}, '
+                f'expected one of {self.POLICIES}.'
+            )
+
+        self.maxsize = maxsize
+        self.policy = policy
+
+        # statistics
+        self.dropped = 0
+        self.spilled = 0
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+        # items put but not yet marked as done
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+        # items are taken in the order they were accepted, so the number
+        # of accepted items marks a point in the queue, and the number of
+        # taken ones identifies the item each consumer is processing
+        self._accepted = 0
+        self._taken = 0
+        self._processing: dict[asyncio.Task, list[int]] = {}
+        self._progress = asyncio.Event()
+
+        self._spill_path = spill_path
+        self._spill: BinaryIO | None = None
+        self._spill_count = 0
+        self._spill_offset = 0
+
+    def qsize(self) -> int:
+        """Number of items waiting, both in memory and on disk."""
+        return self._queue.qsize() + self._spill_count
+
+    def _open_spill(self) -> BinaryIO:
+        """Helper function, opens the spill file on first use."""
+        if self._spill is None:
+            if self._spill_path is None:
+                self._spill = tempfile.TemporaryFile()
+            else:
+                self._spill = open(self._spill_path, 'w+b')
+        return self._spill
+
+    def _spill_item(self, item: Any):
+        """Append the item to the end of the spill file."""
+        spill = self._open_spill()
+        spill.seek(0, os.SEEK_END)
+        pickle.dump(item, spill)
+        self._spill_count += 1
+        self.spilled += 1
+
+    def _unspill_item(self) -> Any:
+        """Read the oldest item from the spill file."""
+        spill = self._open_spill()
+        spill.seek(self._spill_offset)
+        item = pickle.load(spill)
+        self._spill_offset = spill.tell()
+        self._spill_count -= 1
+
+        # reclaim the space, once everything has been read
+        if self._spill_count == 0:
+            spill.seek(0)
+            spill.truncate()
+            self._spill_offset = 0
+
+        return item
+
+    async def put(self, item: Any):
+        """Put the item into the queue, applying the backpressure policy.
+
+        Args:
+            item (Any): Item to put into the queue.
+        """
+        self._unfinished += 1
+        self._finished.clear()
+
+        if self.policy == 'block':
+            try:
+                await self._queue.put(item)
+            except asyncio.CancelledError:
+                # the item never made it into the queue
+                self.task_done()
+                raise
+
+        elif self.policy == 'drop-oldest':
+            if self._queue.full():
+                self._queue.get_nowait()
+                self._taken += 1
+                self.dropped += 1
+                self.task_done()
+            self._queue.put_nowait(item)
+
+        # once spilling started, every item goes to the disk to keep the order
+        elif self._queue.full() or self._spill_count:
+            self._spill_item(item)
+        else:
+            self._queue.put_nowait(item)
+
+        self._accepted += 1
+
+    async def get(self) -> Any:
+        """Remove and return the oldest item from the queue.
+
+        The item is considered processed by the calling task, until it calls
+        task_done().
+        """
+        if self._queue.empty() and self._spill_count:
+            item = self._unspill_item()
+        else:
+            item = await self._queue.get()
+
+        self._processing.setdefault(asyncio.current_task(), []).append(
+            self._taken
+        )
+        self._taken += 1
+        return item
+
+    def task_done(self):
+        """Mark an item taken from the queue as processed."""
+        if self._unfinished <= 0:
+            raise ValueError('task_done() called too many times')
+
+        task = asyncio.current_task()
+        taken = self._processing.get(task)
+        if taken:
+            taken.pop(0)
+            if not taken:
+                del self._processing[task]
+        self._progress.set()
+
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    def mark(self) -> int:
+        """Mark the current end of the queue, to join() up to it later.
+
+        Returns:
+            int: Number of items accepted by the queue so far.
+        """
+        return self._accepted
+
+    def _processed(self, mark: int) -> bool:
+        """Helper function, checks if items before the mark are processed."""
+        return self._taken >= mark and all(
+            taken[0] >= mark for taken in self._processing.values()
+        )
+
+    async def join(self, mark: int | None = None):
+        """Wait until every item put into the queue has been processed.
+
+        Args:
+            mark (int, optional): Wait only for the items put before the
+                mark(), regardless of the items put since. Defaults to None,
+                meaning the queue has to be empty.
+        """
+        if mark is None:
+            await self._finished.wait()
+            return
+
+        while not self._processed(mark):
+            self._progress.clear()
+            await self._progress.wait()
+
+    def close(self):
+        """Close and remove the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            if self._spill_path is not None:
+                os.remove(self._spill_path)
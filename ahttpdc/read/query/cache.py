@@ -0,0 +1,108 @@
+"""In-process cache of query results.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from collections import OrderedDict
+import time
+
+import pandas as pd
+
+__all__ = ['QueryCache']
+
+
+class CacheEntry:
+    """Cached result of a query.
+
+    Args:
+        frame (pd.DataFrame): Result of the query.
+    """
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+        self.created = time.monotonic()
+        self.size = int(frame.memory_usage(index=True).sum())
+
+
+class QueryCache:
+    """LRU cache of DataFrames, bounded by their size in memory.
+
+    Entries expire ttl seconds after they were first stored, regardless of
+    later updates, so data arriving late is eventually picked up.
+
+    Args:
+        ttl (float, optional): Lifetime of an entry, in seconds.
+            Defaults to 300.
+        max_bytes (int, optional): Maximum size of the cached frames, in
+            bytes. Defaults to 256 MiB.
+    """
+
+    def __init__(self, ttl: float = 300, max_bytes: int = 256 * 1024**2):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        """Size of the cached frames, in bytes."""
+        return self._size
+
+    def _evict(self, key: tuple):
+        """Helper function, removes the entry."""
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    def get(self, key: tuple) -> pd.DataFrame | None:
+        """Get the cached frame, if it has not expired yet.
+
+        Args:
+            key (tuple): Key of the query.
+
+        Returns:
+            pd.DataFrame | None: The cached frame or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.created > self.ttl:
+            if entry is not None:
+                self._evict(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.frame
+
+    def put(self, key: tuple, frame: pd.DataFrame, keep_age: bool = False):
+        """Store the frame, evicting the least recently used ones.
+
+        Args:
+            key (tuple): Key of the query.
+            frame (pd.DataFrame): Result of the query.
+            keep_age (bool, optional): Whether an update of an existing
+                entry keeps its original creation time. Defaults to False.
+        """
+        entry = CacheEntry(frame)
+        if key in self._entries:
+            if keep_age:
+                entry.created = self._entries[key].created
+            self._evict(key)
+
+        if entry.size > self.max_bytes:
+            return
+
+        self._entries[key] = entry
+        self._size += entry.size
+
+        while self._size > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def clear(self):
+        """Remove every entry."""
+        self._entries.clear()
+        self._size = 0
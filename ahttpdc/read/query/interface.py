@@ -3,13 +3,20 @@
 Author: Piotr Krzysztof Lis - github.com/straightchlorine
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator
+
 from influxdb_client.client.exceptions import InfluxDBError
 from influxdb_client.client.flux_table import TableList
 from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
 from influxdb_client.client.influxdb_client import InfluxDBClient
 import pandas as pd
 
-from ahttpdc.read.query.parse.data import DataParser
+from ahttpdc.read.query.cache import QueryCache
+from ahttpdc.read.query.parse.data import DataParser, local_offset
+from ahttpdc.read.query.timerange import parse_time, rfc3339
+from ahttpdc.read.schedule import FixedRateScheduler
 
 __all__ = ['AsyncQuery']
 
@@ -27,6 +34,30 @@ class AsyncQuery:
         db_token (str): InfluxDB token to authenticate the user.
         db_org (str): Name of the InfluxDB organization
         db_bucket (str): Name of the InfluxDB bucket.
+        device_tags (list[str], optional): Names of the devices to query, as
+            given in their JSON responses. Defaults to every device.
+        cache_ttl (float, optional): Lifetime, in seconds, of the cached
+            results of historical queries. Defaults to None, which disables
+            the cache.
+        cache_max_bytes (int, optional): Maximum size of the cached results.
+            Defaults to 256 MiB.
+        max_concurrency (int, optional): Maximum number of queries running
+            at the same time. Defaults to 8.
+        query_workers (int, optional): Number of threads running the
+            synchronous queries. Defaults to 4.
+
+    Generated queries are filtered down to the parameters from the sensors
+    dictionary and selected devices, and pivoted into rows by the database.
+
+    With the cache enabled, repeated historical queries with an open end
+    (e.g. '-30d') fetch only the data newer than the cached result and
+    append it, dropping the rows which fell out of the interval.
+
+    Queries share long-lived InfluxDB clients, created on first use. Close
+    them explicitly or use the object as an async context manager:
+
+        async with AsyncQuery(sensors, url, token, org, bucket) as query:
+            df = await query.latest()
     """
 
     def __init__(
@@ -36,56 +67,141 @@ class AsyncQuery:
         db_token: str,
         db_org: str,
         db_bucket: str,
+        device_tags: list[str] | None = None,
+        cache_ttl: float | None = None,
+        cache_max_bytes: int = 256 * 1024**2,
+        max_concurrency: int = 8,
+        query_workers: int = 4,
     ) -> None:
         self.sensors = sensors
         self.db_url = db_url
+        self.device_tags = device_tags
+
+        self._cache = (
+            QueryCache(cache_ttl, cache_max_bytes)
+            if cache_ttl is not None
+            else None
+        )
+
+        # UTC time of the last row returned to each tail subscriber, along
+        # with the rows returned within the grace period before it
+        self._cursors: dict[str, tuple[pd.Timestamp, pd.Index]] = {}
 
         self._token = db_token
         self._org = db_org
         self._bucket = db_bucket
 
-    async def _async_client(self) -> InfluxDBClientAsync:
-        """Helper function, provides asynchronous InfluxDB client."""
+        # shared clients, created on first use
+        self.max_concurrency = max_concurrency
+        self._shared_async_client: InfluxDBClientAsync | None = None
+        self._shared_client: InfluxDBClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._limit: asyncio.Semaphore | None = None
 
-        return InfluxDBClientAsync(
-            url=self.db_url,
-            token=self._token,
-            org=self._org,
-        )
+        # threads running blocking, synchronous queries
+        self.query_workers = query_workers
+        self._executor: ThreadPoolExecutor | None = None
 
-    async def _client(self) -> InfluxDBClient:
-        """Helper function, provides synchronous InfluxDB client."""
+    async def __aenter__(self) -> 'AsyncQuery':
+        return self
 
-        return InfluxDBClient(
-            url=self.db_url,
-            token=self._token,
-            org=self._org,
-        )
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
 
-    async def custom_sync(self, query: str) -> pd.DataFrame:
-        """Pass to the database given query.
+    async def _bind_loop(self):
+        """Bind the asynchronous client and the limit to the running loop.
+
+        Asynchronous client can only be used within the loop it was created
+        in, if the loop changes, the client is closed and replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+
+            client = self._shared_async_client
+            self._shared_async_client = None
+            if client is not None:
+                await client.close()
+
+    async def _async_client(self) -> InfluxDBClientAsync:
+        """Helper function, provides shared asynchronous InfluxDB client."""
+        await self._bind_loop()
+        if self._shared_async_client is None:
+            self._shared_async_client = InfluxDBClientAsync(
+                url=self.db_url,
+                token=self._token,
+                org=self._org,
+                connection_pool_maxsize=self.max_concurrency,
+            )
+        return self._shared_async_client
+
+    async def _client(self) -> InfluxDBClient:
+        """Helper function, provides shared synchronous InfluxDB client."""
+        await self._bind_loop()
+        if self._shared_client is None:
+            self._shared_client = InfluxDBClient(
+                url=self.db_url,
+                token=self._token,
+                org=self._org,
+                connection_pool_maxsize=self.max_concurrency,
+            )
+        return self._shared_client
+
+    async def close(self):
+        """Close the shared clients."""
+        if self._shared_async_client is not None:
+            await self._shared_async_client.close()
+            self._shared_async_client = None
+
+        if self._executor is not None:
+            # queries started meanwhile get a new executor, waiting for the
+            # running ones does not block the loop
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown)
+
+        if self._shared_client is not None:
+            self._shared_client.close()
+            self._shared_client = None
+
+    @staticmethod
+    def _query_sync(client: InfluxDBClient, query: str) -> pd.DataFrame:
+        """Helper function, runs the blocking query and parses the result.
 
         Returns:
             pd.DataFrame: Response to the given query.
         """
         tables: TableList = TableList()
         try:
-            # secure the connection
-            client = await self._client()
-            query_api = client.query_api()
-
-            # query the database
-            tables = query_api.query(query)
-
-            # close the connection
-            client.close()
-
+            tables = client.query_api().query(query)
         except InfluxDBError as e:
             print(f'Exception while querying the database:\n\n{e.message}')
 
         parser = DataParser(tables)
         return parser.into_dataframe()
 
+    async def custom_sync(self, query: str) -> pd.DataFrame:
+        """Pass to the database given query.
+
+        Query runs on the synchronous client within a thread pool, so it
+        does not block the event loop and multiple large queries can run in
+        parallel.
+
+        Returns:
+            pd.DataFrame: Response to the given query.
+        """
+        client = await self._client()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.query_workers, thread_name_prefix='ahttpdc-query'
+            )
+
+        loop = asyncio.get_running_loop()
+        async with self._limit:
+            return await loop.run_in_executor(
+                self._executor, self._query_sync, client, query
+            )
+
     async def custom_async(self, query: str) -> pd.DataFrame:
         """Pass to the database given query.
 
@@ -94,15 +210,9 @@ class AsyncQuery:
         """
         tables: TableList = TableList()
         try:
-            # secure the connection
             client = await self._async_client()
-            query_api = client.query_api()
-
-            # query the database
-            tables = await query_api.query(query)
-
-            # close the connection
-            await client.close()
+            async with self._limit:
+                tables = await client.query_api().query(query)
 
         except InfluxDBError as e:
             print(f'Exception while querying the database:\n\n{e.message}')
@@ -110,14 +220,338 @@ class AsyncQuery:
         parser = DataParser(tables)
         return parser.into_dataframe()
 
+    # pivot records into a row per timestamp and device, and a column per
+    # field, devices sharing a timestamp do not collide
+    _PIVOT = (
+        ' |> keep(columns: ["_time", "device", "_field", "_value"])'
+        ' |> pivot(rowKey: ["_time", "device"], columnKey: ["_field"],'
+        ' valueColumn: "_value")'
+        ' |> group()'
+        ' |> sort(columns: ["_time"])'
+    )
+
+    # pivot of the series already merged over the devices
+    _PIVOT_MERGED = (
+        ' |> keep(columns: ["_time", "_field", "_value"])'
+        ' |> pivot(rowKey: ["_time"], columnKey: ["_field"],'
+        ' valueColumn: "_value")'
+        ' |> sort(columns: ["_time"])'
+    )
+
+    # time, in seconds, rows may be written after newer ones and still be
+    # picked up by the refresh of the cached results
+    GRACE = 60
+
+    # aggregate functions available for the windows
+    AGGREGATES = ('mean', 'min', 'max', 'last', 'median', 'percentile')
+
+    def _fields(
+        self,
+        sensors: list[str] | None = None,
+        fields: list[str] | None = None,
+    ) -> list[str]:
+        """Helper function, lists fields to query.
+
+        Args:
+            sensors (list[str], optional): Sensors, which parameters to
+                query. Defaults to every sensor.
+            fields (list[str], optional): Parameters to query. Overrides
+                sensors. Defaults to None.
+
+        Returns:
+            list[str]: Names of the fields, without duplicates.
+        """
+        if fields is not None:
+            return list(dict.fromkeys(fields))
+
+        sensors = self.sensors if sensors is None else sensors
+        return list(
+            dict.fromkeys(
+                param for sensor in sensors for param in self.sensors[sensor]
+            )
+        )
+
+    def _filter(self, fields: list[str] | None = None) -> str:
+        """Helper function, provides filters of the Flux query.
+
+        Filters are simple comparisons, so the database can push them down
+        to the storage.
+
+        Args:
+            fields (list[str], optional): Fields to keep. Defaults to every
+                parameter from the sensors dictionary.
+
+        Returns:
+            str: filter() calls on the measurement, fields and devices.
+        """
+        fields = self._fields() if fields is None else fields
+
+        query = ' |> filter(fn: (r) => r._measurement == "sensor_data")'
+        if fields:
+            predicate = ' or '.join(f'r._field == "{f}"' for f in fields)
+            query += f' |> filter(fn: (r) => {predicate})'
+        if self.device_tags:
+            predicate = ' or '.join(
+                f'r.device == "{device}"' for device in self.device_tags
+            )
+            query += f' |> filter(fn: (r) => {predicate})'
+
+        return query
+
+    def _range(self, start: str, end: str = '') -> str:
+        """Helper function, provides the range() of the Flux query.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str, optional): End of the time interval. Defaults to ''.
+
+        Returns:
+            str: range() call with given interval.
+        """
+        if start is None:
+            raise InvalidInterval()
+        if end == '':
+            return f'range(start: {start})'
+        return f'range(start: {start}, stop: {end})'
+
+    async def historical_stream(
+        self, start: str, end: str = '', chunk_size: int = 10000
+    ) -> AsyncGenerator[pd.DataFrame, None]:
+        """Stream historical data from the database in chunks.
+
+        Records are pivoted into rows by the database and streamed, so only
+        a single chunk is kept in memory at a time, regardless of the size of
+        the interval.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str, optional): End of the time interval. Defaults to ''.
+            chunk_size (int, optional): Maximum number of rows within a
+                single chunk. Defaults to 10000.
+
+        Yields:
+            pd.DataFrame: Consecutive, time-ordered chunks of the data.
+
+        Examples:
+            async for chunk in query.historical_stream('-90d'):
+                process(chunk)
+        """
+        query = (
+            f'from(bucket:"{self._bucket}")'
+            f' |> {self._range(start, end)}'
+            f'{self._filter()}'
+            f'{self._PIVOT}'
+        )
+
+        client = await self._async_client()
+        try:
+            async with self._limit:
+                records = await client.query_api().query_stream(query)
+
+                chunk = []
+                async for record in records:
+                    chunk.append(record)
+                    if len(chunk) >= chunk_size:
+                        yield DataParser.from_records(chunk).into_dataframe()
+                        chunk = []
+
+                if chunk:
+                    yield DataParser.from_records(chunk).into_dataframe()
+
+        except InfluxDBError as e:
+            print(f'Exception while querying the database:\n\n{e.message}')
+
+    @staticmethod
+    def _row_keys(df: pd.DataFrame) -> pd.Index:
+        """Helper function, identifies the rows by UTC time and device."""
+        times = df.index - local_offset()
+        if 'device' in df.columns:
+            return pd.MultiIndex.from_arrays([times, df['device']])
+        return times
+
+    async def tail(
+        self,
+        subscriber: str = 'default',
+        start: str = '-1h',
+        grace: float = 60,
+    ) -> pd.DataFrame:
+        """Query the rows newer than the ones already returned to the
+        subscriber.
+
+        Rows may be written after newer ones, e.g. batched by another worker
+        or replayed from the spool. Each query starts grace seconds before
+        the cursor, so such rows are still returned, while the rows returned
+        before are dropped.
+
+        Args:
+            subscriber (str, optional): Name of the subscriber, each one has
+                its own cursor. Defaults to 'default'.
+            start (str, optional): Start of the time interval of the first
+                query of the subscriber. Defaults to '-1h'.
+            grace (float, optional): Time, in seconds, rows may arrive late
+                and still be returned. Defaults to 60.
+
+        Returns:
+            pd.DataFrame: Rows, which have not been returned to the
+                subscriber yet.
+        """
+        state = self._cursors.get(subscriber)
+        if state is not None:
+            start = rfc3339(state[0] - pd.Timedelta(grace, 's'))
+
+        df = await self.custom_async(self._historical_query(start))
+        if df.empty:
+            return df
+
+        keys = self._row_keys(df)
+        cursor = keys.get_level_values(0).max()
+        if state is not None:
+            cursor = max(cursor, state[0])
+            df = df[~keys.isin(state[1])]
+
+        # rows returned so far, which the next query will fetch again
+        recent = keys.get_level_values(0) >= cursor - pd.Timedelta(grace, 's')
+        self._cursors[subscriber] = (cursor, keys[recent])
+
+        return df
+
+    async def tail_stream(
+        self,
+        subscriber: str = 'default',
+        interval: float = 1,
+        start: str = '-1h',
+        grace: float = 60,
+    ) -> AsyncGenerator[pd.DataFrame, None]:
+        """Poll the database for new rows at a fixed rate.
+
+        Args:
+            subscriber (str, optional): Name of the subscriber.
+                Defaults to 'default'.
+            interval (float, optional): Time between the polls, in seconds.
+                Defaults to 1.
+            start (str, optional): Start of the time interval of the first
+                query. Defaults to '-1h'.
+            grace (float, optional): Time, in seconds, rows may arrive late
+                and still be returned. Defaults to 60.
+
+        Yields:
+            pd.DataFrame: Rows, which appeared since the previous poll.
+
+        Examples:
+            async for rows in query.tail_stream('dashboard', interval=5):
+                update_chart(rows)
+        """
+        async for _ in FixedRateScheduler(interval):
+            df = await self.tail(subscriber, start, grace)
+            if not df.empty:
+                yield df
+
+    def reset_tail(self, subscriber: str = 'default'):
+        """Forget the cursor of the subscriber.
+
+        Args:
+            subscriber (str, optional): Name of the subscriber.
+                Defaults to 'default'.
+        """
+        self._cursors.pop(subscriber, None)
+
+    @staticmethod
+    def _latest_rows(df: pd.DataFrame) -> pd.DataFrame:
+        """Helper function, collapses the latest values into a row per device.
+
+        Fields may be written at different times, e.g. with DeadbandFilter,
+        so their last values are pivoted into separate, partially empty
+        rows. Each device gets a single row with the latest value of every
+        field, indexed with the time of the most recent one.
+        """
+        if df.empty:
+            return df
+        if 'device' not in df.columns:
+            return df.sort_index(kind='stable').ffill().iloc[-1:]
+
+        rows = (
+            df.sort_index(kind='stable')
+            .rename_axis('time')
+            .reset_index()
+            .groupby('device', sort=False)
+            .last()
+        )
+        return rows.reset_index().set_index('time').sort_index(kind='stable')
+
     async def latest(self) -> pd.DataFrame:
         """Query the database for the latest measurement.
 
         Returns:
-            pd.DataFrame: The latest measurement of every parameter.
+            pd.DataFrame: The latest measurement of every parameter, in
+                a single row per device.
         """
-        query = f'from(bucket:"{self._bucket}") |> range(start: -1h) |> last()'
-        return await self.custom_async(query)
+        query = (
+            f'from(bucket:"{self._bucket}")'
+            ' |> range(start: -1h)'
+            f'{self._filter()}'
+            ' |> last()'
+            f'{self._PIVOT}'
+        )
+        return self._latest_rows(await self.custom_async(query))
+
+    def _historical_query(self, start: str, end: str = '') -> str:
+        """Helper function, provides the query for historical data."""
+        return (
+            f'from(bucket:"{self._bucket}")'
+            f' |> {self._range(start, end)}'
+            f'{self._filter()}'
+            f'{self._PIVOT}'
+        )
+
+    async def _historical_cached(self, start: str, end: str) -> pd.DataFrame:
+        """Query historical data, reusing the cached result.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str): End of the time interval.
+
+        Returns:
+            pd.DataFrame: Data from selected time interval.
+        """
+        query = self._historical_query(start, end)
+        if end == '':
+            try:
+                begin = parse_time(start)
+            except ValueError:
+                # start resolved only by the database (e.g. '-1mo' or
+                # 'now()'), outdated rows could not be dropped from the cache
+                return await self.custom_sync(query)
+
+        key = ('historical', start, end)
+        cached = self._cache.get(key)
+
+        if cached is None or (cached.empty and end == ''):
+            df = await self.custom_sync(query)
+            self._cache.put(key, df)
+            return df.copy()
+
+        # closed interval does not change
+        if end != '':
+            return cached.copy()
+
+        # fetch only the rows newer than the cached ones, along with the
+        # grace period before them, as rows may be written after newer ones
+        offset = local_offset()
+        since = cached.index.max() - pd.Timedelta(self.GRACE, 's')
+        recent = await self.custom_sync(
+            self._historical_query(rfc3339(since - offset))
+        )
+        if not recent.empty:
+            known = self._row_keys(cached[cached.index >= since])
+            recent = recent[~self._row_keys(recent).isin(known)]
+
+        # drop the rows, which are no longer within the interval
+        cutoff = begin + offset
+        df = pd.concat([cached[cached.index >= cutoff], recent])
+        df = df.sort_index(kind='stable')
+
+        self._cache.put(key, df, keep_age=True)
+        return df.copy()
 
     async def historical(self, start: str, end: str = '') -> pd.DataFrame:
         """Query historical data from the database.
@@ -138,21 +572,189 @@ class AsyncQuery:
                 query_historical('-30d')
         """
         try:
-            # TODO: experiment a bit and try to do it asynchronously if possible
-            # tried futures
-            if start is not None and end == '':
-                return await self.custom_sync(
-                    f'from(bucket:"{self._bucket}") |> range(start: {start})'
-                )
-            elif start is not None and end != '':
+            if self._cache is not None:
+                return await self._historical_cached(start, end)
+            return await self.custom_sync(self._historical_query(start, end))
+        except InvalidInterval:
+            print('Invalid interval for the historical query!')
+            return pd.DataFrame()
+
+    def _shards(
+        self, start: str, end: str, shards: int
+    ) -> list[tuple[str, str]]:
+        """Helper function, splits the interval into equal shards.
+
+        Intervals with bounds resolved only by the database, e.g. '-1mo' or
+        'now()', can not be split and are queried as a single shard.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str): End of the time interval, '' meaning now.
+            shards (int): Number of the shards.
+
+        Returns:
+            list[tuple[str, str]]: Consecutive start and stop of each shard.
+        """
+        if start is None or shards < 1:
+            raise InvalidInterval()
+
+        now = pd.Timestamp.now(tz='UTC')
+        try:
+            begin = parse_time(start, now)
+            finish = parse_time(end, now) if end != '' else now
+        except ValueError:
+            return [(start, end)]
+        if begin >= finish:
+            raise InvalidInterval()
+
+        # stop of the range() is exclusive, so the shards do not overlap
+        bounds = pd.date_range(begin, finish, periods=shards + 1)
+        return [
+            (rfc3339(a), rfc3339(b)) for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+
+    async def historical_sharded_stream(
+        self,
+        start: str,
+        end: str = '',
+        shards: int = 4,
+        max_concurrency: int | None = None,
+    ) -> AsyncGenerator[pd.DataFrame, None]:
+        """Query historical data split into time shards queried in parallel.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str, optional): End of the time interval. Defaults to ''.
+            shards (int, optional): Number of the shards. Defaults to 4.
+            max_concurrency (int, optional): Maximum number of shards queried
+                at the same time. Defaults to every shard, still bounded by
+                the concurrency limit of the object.
+
+        Yields:
+            pd.DataFrame: Data of consecutive shards, in time order.
+        """
+        try:
+            intervals = self._shards(start, end, shards)
+        except InvalidInterval:
+            print('Invalid interval for the sharded query!')
+            return
+
+        limit = asyncio.Semaphore(max_concurrency or shards)
+
+        async def query_shard(start: str, end: str) -> pd.DataFrame:
+            async with limit:
                 return await self.custom_sync(
-                    (
-                        f'from(bucket:"{self._bucket}")'
-                        f' |> range(start: {start}, stop: {end})'
-                    )
+                    self._historical_query(start, end)
                 )
-            else:
-                raise InvalidInterval()
+
+        tasks = [asyncio.ensure_future(query_shard(*i)) for i in intervals]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def historical_sharded(
+        self,
+        start: str,
+        end: str = '',
+        shards: int = 4,
+        max_concurrency: int | None = None,
+    ) -> pd.DataFrame:
+        """Query historical data split into time shards queried in parallel.
+
+        Long intervals are split into equal shards, queried at the same time
+        and merged in order, which cuts the time of large backfills.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str, optional): End of the time interval. Defaults to ''.
+            shards (int, optional): Number of the shards. Defaults to 4.
+            max_concurrency (int, optional): Maximum number of shards queried
+                at the same time. Defaults to every shard, still bounded by
+                the concurrency limit of the object.
+
+        Returns:
+            pd.DataFrame: Data from selected time interval.
+
+        Examples:
+            historical_sharded('-90d', shards=9)
+        """
+        frames = [
+            frame
+            async for frame in self.historical_sharded_stream(
+                start, end, shards, max_concurrency
+            )
+        ]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames)
+
+    async def aggregated(
+        self,
+        start: str,
+        end: str = '',
+        window: str = '1m',
+        fn: str = 'mean',
+        sensors: list[str] | None = None,
+        fields: list[str] | None = None,
+        percentile: float = 95,
+    ) -> pd.DataFrame:
+        """Query data aggregated into time windows by the database.
+
+        Args:
+            start (str): Start of the time interval or a relative interval.
+            end (str, optional): End of the time interval. Defaults to ''.
+            window (str, optional): Duration of a single window.
+                Defaults to '1m'.
+            fn (str, optional): Aggregate function, one of: mean, min, max,
+                last, median, percentile. Defaults to 'mean'.
+            sensors (list[str], optional): Sensors, which parameters to
+                query. Defaults to every sensor.
+            fields (list[str], optional): Parameters to query. Overrides
+                sensors. Defaults to None.
+            percentile (float, optional): Percentile computed by the
+                percentile function. Defaults to 95.
+
+        Returns:
+            pd.DataFrame: A row per window and a column per parameter,
+                aggregated over every selected device.
+
+        Examples:
+            Hourly maxima of the gas readings from the last week:
+                aggregated('-7d', window='1h', fn='max', sensors=['mq135'])
+        """
+        if fn not in self.AGGREGATES:
+            raise ValueError(
+                f'Unknown aggregate {fn!r}, expected one of {self.AGGREGATES}.'
+            )
+
+        if fn == 'percentile':
+            fn = (
+                '(column, tables=<-) => tables'
+                f' |> quantile(q: {percentile / 100}, column: column)'
+            )
+
+        # merge the series of the devices, so the windows aggregate the
+        # whole fleet instead of colliding within the pivot, 'last' needs
+        # the merged rows back in time order
+        merge = ' |> group(columns: ["_field"])'
+        if fn == 'last':
+            merge += ' |> sort(columns: ["_time"])'
+
+        try:
+            query = (
+                f'from(bucket:"{self._bucket}")'
+                f' |> {self._range(start, end)}'
+                f'{self._filter(self._fields(sensors, fields))}'
+                f'{merge}'
+                f' |> aggregateWindow(every: {window}, fn: {fn},'
+                ' createEmpty: false)'
+                f'{self._PIVOT_MERGED}'
+            )
         except InvalidInterval:
-            print('Invalid interval for the historical query!')
+            print('Invalid interval for the aggregated query!')
             return pd.DataFrame()
+
+        return await self.custom_async(query)
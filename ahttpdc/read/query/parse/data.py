@@ -5,78 +5,146 @@ Author: Piotr Krzysztof Lis - github.com/straightchlorine
 
 from datetime import datetime, timedelta
 
-from influxdb_client.client.flux_table import TableList
+from influxdb_client.client.flux_table import FluxRecord, FluxTable, TableList
+import numpy as np
 import pandas as pd
 
 
+def local_offset() -> timedelta:
+    """Offset of the local timezone from UTC.
+
+    Returns:
+        timedelta: Current UTC offset of the local time.
+    """
+    offset = datetime.now().astimezone().utcoffset()
+    return offset if offset is not None else timedelta(0)
+
+
 class DataParser:
+    # columns of the records, which are not measured parameters
+    METADATA = ('result', 'table', '_start', '_stop', '_measurement', '_time')
+
+    # tags kept as columns, identifying the rows sharing a timestamp
+    TAGS = ('device',)
+
     def __init__(self, tables: TableList) -> None:
         self.tables = tables
 
-    def _local_time(self, timestamps: set[datetime]):
+    @classmethod
+    def from_records(cls, records: list[FluxRecord]) -> 'DataParser':
+        """Create the parser out of the records, e.g. from a stream.
+
+        Args:
+            records (list[FluxRecord]): Records to parse.
+        Returns:
+            DataParser: Parser of the records.
+        """
+        table = FluxTable()
+        table.records = records
+
+        tables = TableList()
+        tables.append(table)
+        return cls(tables)
+
+    def _pivoted(self) -> bool:
+        """Check if the records were pivoted into a column per field."""
+        for table in self.tables:
+            for record in table.records:
+                return '_field' not in record.values
+        return False
+
+    def _local_time(self, timestamps: pd.DatetimeIndex) -> pd.DatetimeIndex:
         """Accounts for timezone offset, since InfluxDB stores data in UTC.
 
         Args:
-            timestamps (list): A list of UTC timestamps.
+            timestamps (pd.DatetimeIndex): UTC timestamps.
         Returns:
-            list: A list of timestamps in local time.
+            pd.DatetimeIndex: Timestamps in local time.
         """
+        return timestamps + local_offset()
 
-        local_timestamps = []
+    def _columns(self) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+        """Extract time, field and value columns of every record in one pass.
 
-        # current datetime along with timezone
-        now = datetime.now().astimezone()
+        Returns:
+            tuple: UTC timestamps, names of the fields and their values.
+        """
+        times = []
+        fields = []
+        values = []
+
+        for table in self.tables:
+            for record in table.records:
+                row = record.values
+                times.append(row['_time'])
+                fields.append(row['_field'])
+                values.append(row['_value'])
 
-        # UTC offset in seconds
-        offset = now.utcoffset()
-        offset_seconds = offset.total_seconds() if offset is not None else 0
-        local_offset = timedelta(seconds=offset_seconds)
+        return (
+            pd.to_datetime(times, utc=True),
+            np.asarray(fields, dtype=object),
+            np.asarray(values, dtype=np.float64),
+        )
 
-        # add the offset to the timestamps
-        for timestamp in timestamps:
-            utc_time = pd.to_datetime(timestamp)
-            local_time = utc_time + local_offset
-            local_timestamps.append(local_time)
+    def _from_rows(self) -> pd.DataFrame:
+        """Parse records already pivoted by the database into pd.DataFrame.
 
-        return local_timestamps
+        Rows of different devices may share a timestamp, the device tag is
+        kept as a column to tell them apart.
+
+        Returns:
+            pd.DataFrame: procured measurements as a DataFrame.
+        """
+        rows = [
+            record.values for table in self.tables for record in table.records
+        ]
+        df = pd.DataFrame.from_records(rows)
+        if df.empty:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='time'))
+
+        index = pd.to_datetime(df['_time'], utc=True)
+
+        # drop metadata and other tags, leaving the measured parameters and
+        # the device, which measured them
+        df = df.drop(columns=[c for c in self.METADATA if c in df.columns])
+        tags = [
+            c
+            for c in df.columns
+            if c not in self.TAGS
+            and pd.api.types.infer_dtype(df[c], skipna=True) == 'string'
+        ]
+        df = df.drop(columns=tags)
+
+        df.index = self._local_time(pd.DatetimeIndex(index, name='time'))
+        return df.astype(
+            {c: np.float64 for c in df.columns if c not in self.TAGS}
+        )
 
     def into_dataframe(self) -> pd.DataFrame:
         """Parse the query into pd.DataFrame with time as index.
 
-        Args:
-            tables (list): The tables to turn into a DataFrame.
+        Records are pivoted into a column per field and a row per timestamp,
+        unless the database already did that.
+
         Returns:
             pd.DataFrame: procured measurements as a DataFrame sorted by time.
         """
-        read: dict[str, list[str | float]] = {}
-        timestamps: set[datetime] = set()
+        if self._pivoted():
+            return self._from_rows().sort_index(kind='stable')
 
-        # unpacking the table
-        for table in self.tables:
-            for record in table.records:
-                # get the measurements
-                parameter = record.get_field()
-                measurement = record.get_value()
-                timestamps.add(record.get_time())
-
-                # ensure every parameter is present in the dict
-                if parameter not in read:
-                    read[parameter] = []
-                read[parameter].append(float(measurement))
-
-        # convert timestamps to local time
-        local_timestamps = self._local_time(timestamps)
-
-        # if there is no time key, create one
-        if 'time' not in read:
-            read['time'] = []
-
-        # add the timestamps to the data dict
-        for timestamp in local_timestamps:
-            read['time'].append(pd.to_datetime(timestamp))
-
-        df = pd.DataFrame(read)
-        df.set_index('time', inplace=True)
-        df.sort_index(inplace=True)
+        times, fields, values = self._columns()
+
+        # codes of every record within the rows and columns of the frame
+        row, index = pd.factorize(times, sort=True)
+        column, columns = pd.factorize(fields)
+
+        grid = np.full((len(index), len(columns)), np.nan)
+        grid[row, column] = values
+
+        df = pd.DataFrame(
+            grid,
+            index=self._local_time(pd.DatetimeIndex(index, name='time')),
+            columns=pd.Index(columns),
+        )
 
         return df
@@ -0,0 +1,86 @@
+"""Conversions between Flux time literals and Python time objects.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from datetime import timedelta
+import re
+
+import pandas as pd
+
+__all__ = ['parse_duration', 'parse_time', 'rfc3339']
+
+# units of the Flux duration literals
+_UNITS = {
+    'ns': timedelta(microseconds=0.001),
+    'us': timedelta(microseconds=1),
+    'µs': timedelta(microseconds=1),
+    'ms': timedelta(milliseconds=1),
+    's': timedelta(seconds=1),
+    'm': timedelta(minutes=1),
+    'h': timedelta(hours=1),
+    'd': timedelta(days=1),
+    'w': timedelta(weeks=1),
+}
+
+_DURATION = re.compile(r'^-?(\d+(ns|us|µs|ms|s|m|h|d|w))+$')
+_PART = re.compile(r'(\d+)(ns|us|µs|ms|s|m|h|d|w)')
+
+
+def parse_duration(duration: str) -> timedelta | None:
+    """Parse a Flux duration literal, e.g. '-30d' or '1h30m'.
+
+    Months and years are not supported, as their length varies.
+
+    Args:
+        duration (str): Duration literal.
+
+    Returns:
+        timedelta | None: Parsed duration or None, if the string is not
+            a duration literal.
+    """
+    duration = duration.strip()
+    if not _DURATION.match(duration):
+        return None
+
+    total = sum(
+        (int(n) * _UNITS[unit] for n, unit in _PART.findall(duration)),
+        timedelta(0),
+    )
+    return -total if duration.startswith('-') else total
+
+
+def parse_time(time: str, now: pd.Timestamp | None = None) -> pd.Timestamp:
+    """Resolve a relative duration or an RFC3339 timestamp to UTC time.
+
+    Args:
+        time (str): Relative duration (e.g. '-30d') or a timestamp.
+        now (pd.Timestamp, optional): Time the duration is relative to.
+            Defaults to the current time.
+
+    Returns:
+        pd.Timestamp: Time in UTC.
+    """
+    duration = parse_duration(time)
+    if duration is None:
+        timestamp = pd.Timestamp(time)
+        if timestamp.tzinfo is None:
+            return timestamp.tz_localize('UTC')
+        return timestamp.tz_convert('UTC')
+
+    now = pd.Timestamp.now(tz='UTC') if now is None else now
+    return now + duration
+
+
+def rfc3339(time: pd.Timestamp) -> str:
+    """Format the time as an RFC3339 literal understood by Flux.
+
+    Args:
+        time (pd.Timestamp): Timezone-aware time.
+
+    Returns:
+        str: Time in UTC with nanosecond precision, e.g.
+            2024-05-16T00:00:00.000000000Z
+    """
+    time = time.tz_convert('UTC')
+    return f'{time.strftime("%Y-%m-%dT%H:%M:%S")}.{time.value % 10**9:09d}Z'
@@ -0,0 +1,84 @@
+"""Fixed-rate scheduling of the polling loops.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+import random
+
+__all__ = ['FixedRateScheduler']
+
+
+class FixedRateScheduler:
+    """Asynchronous iterator firing ticks at a fixed rate.
+
+    Ticks are aligned to the monotonic clock of the event loop, so the time
+    spent between the ticks does not stretch the period. If the consumer
+    falls behind by more than one interval, the ticks it could not make are
+    skipped and reported instead of being fired in a burst.
+
+        async for missed in FixedRateScheduler(0.5):
+            if missed:
+                print(f'Missed {missed} ticks')
+            await poll()
+
+    Args:
+        interval (float): Time between the ticks, in seconds.
+        phase (float, optional): Delay of the first tick, in seconds.
+            Defaults to 0.
+        jitter (float, optional): Upper bound of a random delay added to
+            every tick, in seconds. Does not accumulate. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        phase: float = 0,
+        jitter: float = 0,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError('Interval of the scheduler must be positive.')
+
+        self.interval = interval
+        self.phase = phase
+        self.jitter = jitter
+
+        # statistics
+        self.ticks = 0
+        self.missed = 0
+
+        self._origin: float | None = None
+        self._tick = 0
+
+    def __aiter__(self) -> 'FixedRateScheduler':
+        return self
+
+    async def __anext__(self) -> int:
+        """Wait for the next tick.
+
+        Returns:
+            int: Number of ticks missed since the previous one.
+        """
+        now = asyncio.get_running_loop().time()
+        if self._origin is None:
+            self._origin = now + self.phase
+        else:
+            self._tick += 1
+
+        # skip every tick, which deadline has already passed
+        missed = 0
+        late = now - (self._origin + self._tick * self.interval)
+        if late >= self.interval:
+            missed = int(late // self.interval)
+            self._tick += missed
+            self.missed += missed
+
+        deadline = self._origin + self._tick * self.interval
+        if self.jitter:
+            deadline += random.uniform(0, self.jitter)
+
+        if deadline > now:
+            await asyncio.sleep(deadline - now)
+
+        self.ticks += 1
+        return missed
@@ -0,0 +1,89 @@
+"""Consistent hashing of devices onto the daemon workers.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import bisect
+import hashlib
+from typing import Hashable
+
+__all__ = ['HashRing']
+
+
+class HashRing:
+    """Consistent hash ring assigning keys to nodes.
+
+    Every node is placed on the ring at replicas points. A key belongs to
+    the first node clockwise of its hash, so adding or removing a node moves
+    only the keys of that node.
+
+        ring = HashRing(range(4))
+        ring.node('http://192.168.1.100/circumstances')  # e.g. 2
+
+    Args:
+        nodes (Iterable[Hashable]): Nodes of the ring.
+        replicas (int, optional): Number of points of each node on the ring.
+            More points spread the keys more evenly. Defaults to 100.
+    """
+
+    def __init__(self, nodes=(), replicas: int = 100) -> None:
+        self.replicas = replicas
+        self._hashes: list[int] = []
+        self._nodes: list[Hashable] = []
+
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        """Helper function, stable hash of the key."""
+        return int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big'
+        )
+
+    def __len__(self) -> int:
+        return len(set(self._nodes))
+
+    def add(self, node: Hashable):
+        """Place the node on the ring.
+
+        Args:
+            node (Hashable): Node to add.
+        """
+        for replica in range(self.replicas):
+            point = self._hash(f'{node!r}#{replica}')
+            i = bisect.bisect(self._hashes, point)
+            self._hashes.insert(i, point)
+            self._nodes.insert(i, node)
+
+    def remove(self, node: Hashable):
+        """Remove every point of the node from the ring.
+
+        Args:
+            node (Hashable): Node to remove.
+        """
+        kept = [
+            (point, n)
+            for point, n in zip(self._hashes, self._nodes)
+            if n != node
+        ]
+        self._hashes = [point for point, _ in kept]
+        self._nodes = [n for _, n in kept]
+
+    def node(self, key: str) -> Hashable:
+        """Find the node the key belongs to.
+
+        Args:
+            key (str): Key to look up, e.g. URL of the device.
+
+        Returns:
+            Hashable: Node responsible for the key.
+
+        Raises:
+            LookupError: If the ring is empty.
+        """
+        if not self._hashes:
+            raise LookupError('HashRing has no nodes.')
+
+        i = bisect.bisect(self._hashes, self._hash(key))
+        return self._nodes[i % len(self._nodes)]
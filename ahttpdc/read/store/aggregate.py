@@ -0,0 +1,229 @@
+"""Pre-aggregation of the parsed records into time windows.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import numpy as np
+
+__all__ = ['WindowAggregator']
+
+
+class _Window:
+    """Readings of a single device within the current window.
+
+    Readings are kept in a fixed-size NumPy buffer with a column per field.
+    Once the buffer fills up, it is folded into running count, sum, minimum
+    and maximum of every field and reused, so memory does not grow with the
+    number of readings.
+
+    Args:
+        capacity (int): Number of readings the buffer holds.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.start = 0
+        self.columns: dict[str, int] = {}
+
+        self._buffer = np.full((capacity, 0), np.nan)
+        self._size = 0
+
+        self._count = np.zeros(0)
+        self._total = np.zeros(0)
+        self._low = np.zeros(0)
+        self._high = np.zeros(0)
+
+    def _add_column(self, field: str) -> int:
+        """Helper function, makes room for a new field."""
+        column = self.columns[field] = len(self.columns)
+
+        self._buffer = np.pad(
+            self._buffer, ((0, 0), (0, 1)), constant_values=np.nan
+        )
+        self._count = np.append(self._count, 0)
+        self._total = np.append(self._total, 0)
+        self._low = np.append(self._low, np.inf)
+        self._high = np.append(self._high, -np.inf)
+        return column
+
+    def _fold(self):
+        """Helper function, folds the buffer into the running aggregates."""
+        if not self._size:
+            return
+
+        chunk = self._buffer[: self._size]
+        valid = ~np.isnan(chunk)
+
+        self._count += valid.sum(axis=0)
+        self._total += np.where(valid, chunk, 0).sum(axis=0)
+        # fmin and fmax ignore NaN of the missing readings
+        self._low = np.fmin(self._low, np.fmin.reduce(chunk, axis=0))
+        self._high = np.fmax(self._high, np.fmax.reduce(chunk, axis=0))
+
+        chunk.fill(np.nan)
+        self._size = 0
+
+    def add(self, fields: dict[str, float]):
+        """Add readings to the window.
+
+        Args:
+            fields (dict[str, float]): Fields of the record.
+        """
+        if self._size == len(self._buffer):
+            self._fold()
+
+        for field, value in fields.items():
+            column = self.columns.get(field)
+            if column is None:
+                column = self._add_column(field)
+            self._buffer[self._size, column] = value
+        self._size += 1
+
+    def aggregate(self) -> dict[str, float]:
+        """Summarize the readings of the window.
+
+        Returns:
+            dict[str, float]: Mean of every field under its own name, along
+                with its _min, _max and _count.
+        """
+        self._fold()
+
+        fields = {}
+        for field, column in self.columns.items():
+            count = self._count[column]
+            if not count:
+                continue
+
+            fields[field] = float(self._total[column] / count)
+            fields[f'{field}_min'] = float(self._low[column])
+            fields[f'{field}_max'] = float(self._high[column])
+            fields[f'{field}_count'] = float(count)
+        return fields
+
+    def reset(self, start: int):
+        """Start the next window, reusing the buffers.
+
+        Args:
+            start (int): Start of the window, in milliseconds since the epoch.
+        """
+        self.start = start
+        self._buffer[: self._size].fill(np.nan)
+        self._size = 0
+
+        self._count.fill(0)
+        self._total.fill(0)
+        self._low.fill(np.inf)
+        self._high.fill(-np.inf)
+
+
+class WindowAggregator:
+    """Summarize records of every device into fixed time windows.
+
+    Windows are aligned to the epoch. Once a record of the next window
+    arrives, a single record summarizing the previous one is emitted,
+    stamped with the start of the window. It holds the mean of every field
+    under the name of the field, so the queries keep working, along with
+    its minimum, maximum and count as <field>_min, <field>_max and
+    <field>_count, so short transients are not lost. Windows of devices,
+    which went silent, are emitted by the flush timer of the collector once
+    they end, windows in progress are emitted when the collector closes.
+
+    Aggregator is a stage of AsyncCollector, placed between the parser and
+    the serializer:
+
+        collector = AsyncCollector(..., stages=[WindowAggregator(60)])
+
+    Args:
+        window (float, optional): Length of the window, in seconds.
+            Defaults to 60.
+        capacity (int, optional): Number of readings buffered per device
+            before they are folded into the running aggregates.
+            Defaults to 256.
+    """
+
+    def __init__(self, window: float = 60, capacity: int = 256) -> None:
+        if window <= 0:
+            raise ValueError('Window of the aggregator must be positive.')
+
+        self.window = window
+        self.capacity = capacity
+
+        # statistics
+        self.aggregated = 0
+        self.emitted = 0
+
+        self._window_ms = int(window * 1000)
+        self._windows: dict[str, _Window] = {}
+        self._series: dict[str, tuple[str, dict]] = {}
+
+    def _emit(self, device: str, window: _Window) -> list[dict]:
+        """Helper function, provides the record summarizing the window."""
+        fields = window.aggregate()
+        if not fields:
+            return []
+
+        measurement, tags = self._series[device]
+        self.emitted += 1
+        return [
+            {
+                'measurement': measurement,
+                'tags': tags,
+                'timestamp': window.start,
+                'fields': fields,
+            }
+        ]
+
+    def process(self, record: dict) -> list[dict]:
+        """Add the record to the window of its device.
+
+        Args:
+            record (dict): Record of JSONInfluxParser.
+
+        Returns:
+            list[dict]: Summary of the previous window, if the record starts
+                a new one, otherwise empty.
+        """
+        device = record['tags']['device']
+        timestamp = record['timestamp']
+        start = timestamp - timestamp % self._window_ms
+
+        output = []
+        window = self._windows.get(device)
+        if window is None:
+            window = self._windows[device] = _Window(self.capacity)
+            window.start = start
+        elif start > window.start:
+            output = self._emit(device, window)
+            window.reset(start)
+
+        self._series[device] = (record['measurement'], record['tags'])
+        window.add(record['fields'])
+        self.aggregated += 1
+        return output
+
+    def flush(self, now: int | None = None) -> list[dict]:
+        """Emit windows, which ended, or every window in progress.
+
+        Args:
+            now (int, optional): Current time, in milliseconds since the
+                epoch. Only the windows, which ended by then, are emitted.
+                Defaults to None, meaning every window.
+
+        Returns:
+            list[dict]: Summaries of the windows.
+        """
+        if now is None:
+            output = []
+            for device, window in self._windows.items():
+                output.extend(self._emit(device, window))
+            self._windows.clear()
+            return output
+
+        # records arriving later are added to the window of the current time
+        start = now - now % self._window_ms
+
+        output = []
+        for device, window in self._windows.items():
+            if window.start < start:
+                output.extend(self._emit(device, window))
+                window.reset(start)
+        return output
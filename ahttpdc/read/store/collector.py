@@ -3,21 +3,71 @@
 Author: Piotr Krzysztof Lis - github.com/straightchlorine
 """
 
+import asyncio
+
 from influxdb_client.client.influxdb_client_async import InfluxDBClientAsync
-from influxdb_client.client.write.point import Point
+from influxdb_client.client.write_api_async import WriteApiAsync
+from influxdb_client.domain.write_precision import WritePrecision
+from influxdb_client.rest import ApiException
 
+from ahttpdc.read.fetch.reading import MonotonicClock
 from ahttpdc.read.store.parse.parser import JSONInfluxParser
+from ahttpdc.read.store.serialize import LineSerializer
+from ahttpdc.read.store.spool import Spool
 
 
 class AsyncCollector:
     """Store the data asynchronously within InfluxDB.
 
+    By default every reading is written as soon as it is stored. With
+    batch_size greater than 1, points are buffered in memory as line protocol
+    and written in batches, once the buffer fills up or flush_interval
+    passes. Batching applies only while the collector is open, either
+    explicitly or as an async context manager, which keeps a single client
+    for all the writes and flushes the buffer on close:
+
+        async with AsyncCollector(sensors, url, token, org, bucket,
+                                  batch_size=500) as collector:
+            await collector.store_readings(json_response)
+
+    With spool_dir set, points which could not be written are appended to
+    an on-disk Spool instead of being lost. While the collector is open,
+    spooled points are replayed in large batches, at most replay_rate points
+    per second, once the database is reachable again.
+
     Args:
         sensors (dict[str, list[str]]): readings to store from each sensor.
         db_url (str): url link to the InfluxDB.
         db_token (str): token to the InfluxDB.
         db_org (str): organization in the InfluxDB
         db_bucket (str): bucket to store data within in InfluxDB
+        batch_size (int, optional): number of points written in a single
+            request. Defaults to 1.
+        flush_interval (float, optional): maximum time, in seconds, points
+            wait in the buffer. Defaults to 1.
+        max_concurrent_flushes (int, optional): number of batches written at
+            the same time. Defaults to 4.
+        spool_dir (str, optional): directory of the spool for points, which
+            could not be written. Defaults to None, meaning such points are
+            discarded.
+        spool_max_bytes (int, optional): maximum size of the spool on the
+            disk. Defaults to 1 GiB.
+        replay_batch_size (int, optional): number of spooled points written
+            in a single request. Defaults to 5000.
+        replay_rate (float, optional): maximum number of spooled points
+            written per second. Defaults to 50000.
+        replay_interval (float, optional): time, in seconds, between the
+            attempts to replay the spool. Defaults to 5.
+        aggregation (str, optional): how readings of a parameter measured by
+            multiple sensors are combined: 'mean', 'median' or 'priority'.
+            Defaults to 'mean'.
+        stages (list, optional): stages the parsed records pass through
+            before being written, in order, e.g. DeadbandFilter. Each stage
+            provides process(record) and flush(now=None) methods, both
+            returning a list of records. Every flush_interval seconds, the
+            stages are flushed with the current time, in milliseconds since
+            the epoch, to release the records finished by then, and without
+            it on close. Defaults to None.
     """
 
     def __init__(
@@ -27,33 +77,341 @@ class AsyncCollector:
         db_token: str,
         db_org: str,
         db_bucket: str,
+        batch_size: int = 1,
+        flush_interval: float = 1,
+        max_concurrent_flushes: int = 4,
+        spool_dir: str | None = None,
+        spool_max_bytes: int = 1024**3,
+        replay_batch_size: int = 5000,
+        replay_rate: float = 50000,
+        replay_interval: float = 5,
+        aggregation: str = 'mean',
+        stages: list | None = None,
     ) -> None:
         self._sensors = sensors
-        self._parser = JSONInfluxParser(self._sensors)
+        self._parser = JSONInfluxParser(self._sensors, aggregation)
+        self._stages = list(stages) if stages is not None else []
+        self._serializer = LineSerializer()
+        self._clock = MonotonicClock()
 
         self._url = db_url
         self._token = db_token
         self._org = db_org
         self._bucket = db_bucket
 
-    async def store_readings(self, json_response):
-        """Store sensor readings within InfluxDB.
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
 
-        JSON response is parsed, decorated and stored in InfluxDB.
+        self._buffer: list[bytes] = []
+        self._flush_limit = asyncio.Semaphore(max_concurrent_flushes)
+        self._flushes: set[asyncio.Task] = set()
+        self._flush_timer: asyncio.Task | None = None
 
-        Args:
-            records (dict): The sensor readings as InfluxDB record.
-        """
-        # creating the time-series point out of the record
-        record = self._parser.parse(json_response)
-        point = Point.from_dict(record, write_precision='ms')
+        self._spool = (
+            Spool(spool_dir, max_bytes=spool_max_bytes)
+            if spool_dir is not None
+            else None
+        )
+        self.replay_batch_size = replay_batch_size
+        self.replay_rate = replay_rate
+        self.replay_interval = replay_interval
+        self._replay_timer: asyncio.Task | None = None
+
+        self._client: InfluxDBClientAsync | None = None
+        self._write_api: WriteApiAsync | None = None
+
+    async def __aenter__(self) -> 'AsyncCollector':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @property
+    def buffered(self) -> int:
+        """Number of points waiting in the buffer."""
+        return len(self._buffer)
 
-        # writing created point into influx
-        async with InfluxDBClientAsync(
+    @property
+    def spooled(self) -> int:
+        """Size of the spool, in bytes."""
+        return self._spool.size if self._spool is not None else 0
+
+    def _new_client(self) -> InfluxDBClientAsync:
+        """Helper function, provides asynchronous InfluxDB client."""
+
+        return InfluxDBClientAsync(
             url=self._url,
             token=self._token,
             org=self._org,
-        ) as client:
+        )
+
+    async def open(self):
+        """Open the client shared by the writes and start the background
+        flushing and replaying of the spool."""
+        if self._client is None:
+            self._client = self._new_client()
+            self._write_api = self._client.write_api()
+
+        # stages release the finished records on the timer as well
+        periodic = self.batch_size > 1 or bool(self._stages)
+        if periodic and self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_periodically())
+
+        if self._spool is not None and self._replay_timer is None:
+            self._replay_timer = asyncio.create_task(
+                self._replay_periodically()
+            )
+
+    async def close(self):
+        """Flush buffered points and close the client."""
+        for timer in (self._flush_timer, self._replay_timer):
+            if timer is not None:
+                timer.cancel()
+        self._flush_timer = None
+        self._replay_timer = None
+
+        # records held back by the stages are written as well
+        await self._enqueue(self._serialize(self._flush_stages()))
+        await self.flush()
+
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self._write_api = None
+
+    async def _write(self, lines: list[bytes]):
+        """Write given line protocol records into InfluxDB.
+
+        Records are joined into a single body, sent in one request.
+
+        Args:
+            lines (list[bytes]): Points serialized into line protocol.
+        """
+        body = b'\n'.join(lines)
+
+        if self._write_api is not None:
+            await self._write_api.write(
+                bucket=self._bucket,
+                org=self._org,
+                record=body,
+                write_precision=WritePrecision.MS,
+            )
+            return
+
+        async with self._new_client() as client:
             await client.write_api().write(
-                bucket=self._bucket, org=self._org, record=point
+                bucket=self._bucket,
+                org=self._org,
+                record=body,
+                write_precision=WritePrecision.MS,
             )
+
+    async def _write_or_spool(self, lines: list[bytes]):
+        """Write the records, spooling them on failure.
+
+        Without the spool, the error is raised.
+
+        Args:
+            lines (list[bytes]): Points serialized into line protocol.
+        """
+        try:
+            await self._write(lines)
+        except Exception as e:
+            if self._spool is None:
+                raise
+
+            print(f'Error writing {len(lines)} points, spooling: {e!r}')
+            await asyncio.to_thread(self._spool.append, lines)
+
+    async def _write_batch(self, batch: list[bytes]):
+        """Write the batch, releasing the flush slot afterwards.
+
+        Args:
+            batch (list[bytes]): Points serialized into line protocol.
+        """
+        try:
+            await self._write_or_spool(batch)
+        except Exception as e:
+            print(f'Error writing batch of {len(batch)} points: {e!r}')
+        finally:
+            self._flush_limit.release()
+
+    # statuses of the batches the database will never accept
+    REJECTED = (400, 413, 422)
+
+    async def _replay_batch(self, batch: list[bytes]):
+        """Write the batch of spooled points.
+
+        Batches too large for the database are split in halves. Batches
+        rejected for good, e.g. malformed or outside of the retention period
+        of the bucket, are discarded, so they do not block the spool.
+
+        Args:
+            batch (list[bytes]): Points serialized into line protocol.
+        """
+        try:
+            await self._write(batch)
+        except ApiException as e:
+            if e.status == 413 and len(batch) > 1:
+                half = len(batch) // 2
+                await self._replay_batch(batch[:half])
+                await self._replay_batch(batch[half:])
+                return
+            if e.status not in self.REJECTED:
+                raise
+            print(f'Discarding {len(batch)} rejected points: {e!r}')
+
+    async def _replay(self):
+        """Write spooled points into the database, oldest segment first.
+
+        Segment is removed after all of its points have been written or
+        rejected by the database. On any other error, the error is raised and
+        the segment is kept for the next attempt.
+        """
+        for segment in self._spool.seal():
+            try:
+                lines = await asyncio.to_thread(self._spool.read, segment)
+            except FileNotFoundError:
+                continue
+
+            for i in range(0, len(lines), self.replay_batch_size):
+                batch = lines[i : i + self.replay_batch_size]
+                await self._replay_batch(batch)
+
+                # limit the rate, not to overwhelm recovering database
+                await asyncio.sleep(len(batch) / self.replay_rate)
+
+            self._spool.remove(segment)
+
+    async def _replay_periodically(self):
+        """Replay the spool every replay_interval seconds."""
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            if self._spool.empty():
+                continue
+
+            try:
+                await self._replay()
+            except Exception as e:
+                print(f'Error replaying the spool: {e!r}')
+
+    async def _schedule_flush(self):
+        """Hand the buffer over to a background write.
+
+        Waits if max_concurrent_flushes batches are already being written,
+        which applies backpressure to the producers. Buffer taken over by
+        another producer meanwhile is not written again.
+        """
+        await self._flush_limit.acquire()
+        if not self._buffer:
+            self._flush_limit.release()
+            return
+        batch, self._buffer = self._buffer, []
+
+        task = asyncio.create_task(self._write_batch(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_periodically(self):
+        """Flush the stages and the buffer every flush_interval seconds.
+
+        Stages release the records finished by now, e.g. windows of devices,
+        which went silent.
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._stages:
+                now = self._clock.now() // 1_000_000
+                try:
+                    await self._enqueue(
+                        self._serialize(self._flush_stages(now))
+                    )
+                except Exception as e:
+                    print(f'Error writing records of the stages: {e!r}')
+
+            if self._buffer:
+                await self._schedule_flush()
+
+    async def flush(self):
+        """Write every buffered point and wait for pending batches."""
+        if self._buffer:
+            await self._schedule_flush()
+
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    def _process(self, records: list[dict], stages: list) -> list[dict]:
+        """Helper function, passes the records through the stages."""
+        for stage in stages:
+            records = [
+                output
+                for record in records
+                for output in stage.process(record)
+            ]
+        return records
+
+    def _flush_stages(self, now: int | None = None) -> list[dict]:
+        """Helper function, collects records held back by the stages.
+
+        Records flushed by a stage are passed through the following ones.
+
+        Args:
+            now (int, optional): Current time, in milliseconds since the
+                epoch, only the records finished by then are collected.
+                Defaults to None, meaning every record.
+        """
+        records = []
+        for i, stage in enumerate(self._stages):
+            records.extend(
+                self._process(stage.flush(now), self._stages[i + 1 :])
+            )
+        return records
+
+    def _serialize(self, records: list[dict]) -> list[bytes]:
+        """Helper function, serializes the records into line protocol."""
+        lines = []
+        for record in records:
+            line = self._serializer.serialize(record)
+            if line is not None:
+                lines.append(line)
+        return lines
+
+    async def _enqueue(self, lines: list[bytes]):
+        """Write the records or buffer them, if batching.
+
+        Args:
+            lines (list[bytes]): Points serialized into line protocol.
+        """
+        if not lines:
+            return
+
+        if self.batch_size <= 1 or self._client is None:
+            # writing created points into influx
+            await self._write_or_spool(lines)
+            return
+
+        self._buffer.extend(lines)
+        if len(self._buffer) >= self.batch_size:
+            await self._schedule_flush()
+
+    async def store_readings(
+        self, json_response, timestamp: int | None = None
+    ):
+        """Store sensor readings within InfluxDB.
+
+        JSON response is parsed, passed through the stages, decorated and
+        stored in InfluxDB.
+
+        Args:
+            json_response (dict): The sensor readings to store.
+            timestamp (int, optional): Time the readings were taken, in
+                milliseconds since the epoch, e.g. Reading.timestamp.
+                Defaults to the current time.
+        """
+        records = [self._parser.parse(json_response, timestamp)]
+        if self._stages:
+            records = self._process(records, self._stages)
+
+        # serializing the records straight into line protocol
+        await self._enqueue(self._serialize(records))
@@ -0,0 +1,95 @@
+"""Deadband filtering of the parsed records before they are written.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+__all__ = ['DeadbandFilter']
+
+
+class DeadbandFilter:
+    """Drop fields, which did not change by more than their deadband.
+
+    Every field is compared with the last value of the same device written
+    to the database. Field is kept, if it differs by more than the deadband
+    or was last written at least heartbeat seconds ago, otherwise it is
+    removed from the record. Records left without fields are dropped.
+
+    Filter is a stage of AsyncCollector, placed between the parser and the
+    serializer:
+
+        deadband = DeadbandFilter(
+            {'altitude': 0.5, 'seaLevelPressure': 0.1}, heartbeat=60
+        )
+        collector = AsyncCollector(..., stages=[deadband])
+
+    Args:
+        deadbands (dict[str, float], optional): Absolute deadband of the
+            fields. Defaults to None.
+        default (float, optional): Deadband of the fields missing from the
+            deadbands. Defaults to 0, meaning only repeated values are
+            dropped.
+        heartbeat (float, optional): Maximum time, in seconds, between the
+            writes of a field. Defaults to 60.
+    """
+
+    def __init__(
+        self,
+        deadbands: dict[str, float] | None = None,
+        default: float = 0,
+        heartbeat: float = 60,
+    ) -> None:
+        self.deadbands = dict(deadbands) if deadbands is not None else {}
+        self.default = default
+        self.heartbeat = heartbeat
+
+        # statistics
+        self.passed = 0
+        self.dropped = 0
+
+        # device -> field -> (value, timestamp) of the last write
+        self._last: dict[str, dict[str, tuple[float, int]]] = {}
+        self._heartbeat_ms = int(heartbeat * 1000)
+
+    def process(self, record: dict) -> list[dict]:
+        """Remove fields, which stayed within their deadband.
+
+        Args:
+            record (dict): Record of JSONInfluxParser.
+
+        Returns:
+            list[dict]: Record with the remaining fields, empty if none of
+                them changed.
+        """
+        last = self._last.setdefault(record['tags']['device'], {})
+        timestamp = record['timestamp']
+
+        fields = {}
+        for field, value in record['fields'].items():
+            previous = last.get(field)
+            if (
+                previous is None
+                or abs(value - previous[0])
+                > self.deadbands.get(field, self.default)
+                or timestamp - previous[1] >= self._heartbeat_ms
+            ):
+                fields[field] = value
+                last[field] = (value, timestamp)
+
+        self.passed += len(fields)
+        self.dropped += len(record['fields']) - len(fields)
+
+        if not fields:
+            return []
+        return [{**record, 'fields': fields}]
+
+    def flush(self, now: int | None = None) -> list[dict]:
+        """Provide records held back by the stage.
+
+        Args:
+            now (int, optional): Current time, in milliseconds since the
+                epoch. Defaults to None.
+
+        Returns:
+            list[dict]: Always empty, as the filter does not hold records.
+        """
+        return []
@@ -3,7 +3,9 @@
 Author: Piotr Krzysztof Lis - github.com/straightchlorine
 """
 
-import datetime
+import math
+import statistics
+import time
 
 
 class JSONInfluxParser:
@@ -39,18 +41,66 @@ class JSONInfluxParser:
     Args:
         sensors (dict[str, list[str]]): Dict of sensors and parameters to
             collect.
+        aggregation (str, optional): How readings of a parameter measured
+            by multiple sensors are combined: 'mean', 'median' or
+            'priority' - the reading of the sensor listed first in the
+            sensors dictionary is used. Defaults to 'mean'.
     """
 
-    def __init__(self, sensors):
+    AGGREGATIONS = {
+        'mean': lambda values: math.fsum(values) / len(values),
+        'median': statistics.median,
+        'priority': None,
+    }
+
+    def __init__(self, sensors, aggregation: str = 'mean'):
+        if aggregation not in self.AGGREGATIONS:
+            raise ValueError(
+                f'Unknown aggregation {aggregation!r}, '
+                f'expected one of {tuple(self.AGGREGATIONS)}.'
+            )
+
         self._sensors = sensors
+        self.aggregation = aggregation
+        self._aggregate = self.AGGREGATIONS[aggregation]
+        self._single, self._multiple = self._compile(sensors)
+
+    def _compile(self, sensors):
+        """Compile the sensors dictionary into a flat extraction plan.
+
+        Parameters measured by a single sensor (or resolved by priority)
+        are read directly, the rest are aggregated.
+
+        Args:
+            sensors (dict[str, list[str]]): Dict of sensors and parameters to
+                collect.
+
+        Returns:
+            tuple: (parameter, sensor) pairs read directly and
+                (parameter, sensors) pairs to aggregate.
+        """
+        sources: dict[str, list[str]] = {}
+        for sensor, params in sensors.items():
+            for param in params:
+                if sensor not in sources.setdefault(param, []):
+                    sources[param].append(sensor)
+
+        single = []
+        multiple = []
+        for param, measured_by in sources.items():
+            if len(measured_by) == 1 or self._aggregate is None:
+                single.append((param, measured_by[0]))
+            else:
+                multiple.append((param, tuple(measured_by)))
+
+        return tuple(single), tuple(multiple)
 
     def _to_fields(self, json_response, device) -> dict[str, float]:
         """Parse measured parameters from JSON response to a dictionary.
 
         Sensors dictionary defines which parameters will be stored in the
         database. In case of multiple readings of the same parameter,
-        the average is calculated.
-
+        they are combined according to the aggregation.
 
         Args:
             json_response (dict): The sensor readings to parse.
@@ -59,27 +109,25 @@ class JSONInfluxParser:
             fields (dict[str, float]): Parameter-value pairs extracted from
                 the JSON file.
         """
+        readings = json_response[device]
 
-        fields = {}
-        for sensor in self._sensors:
-            for param in self._sensors[sensor]:
-                if param not in fields:
-                    fields[param] = float(json_response[device][sensor][param])
-                else:
-                    # if the measurement already has been recorded, calculate
-                    # the average of the measurements
-                    previous = fields[param]
-                    current = float(json_response[device][sensor][param])
-                    average = (previous + current) / 2
-                    fields[param] = average
+        fields = {
+            param: float(readings[sensor][param])
+            for param, sensor in self._single
+        }
+        for param, sensors in self._multiple:
+            fields[param] = self._aggregate(
+                [float(readings[sensor][param]) for sensor in sensors]
+            )
 
         return fields
 
-    def parse(self, json_measurements):
+    def parse(self, json_measurements, timestamp: int | None = None):
         """Parse raw json file into records for InfluxDB.
 
-        Note: if one parameter is selected for multiple sensors, the average
-        of those measurements will be saved.
+        Note: if one parameter is selected for multiple sensors, the
+        measurements are combined according to the aggregation, by default
+        their average is saved.
 
         For example: multiple temperature readings from 3 sensors and all of
         them are selected via sensors dictionary.
@@ -90,18 +138,24 @@ class JSONInfluxParser:
 
         Args:
             json_measurements (dict): The sensor readings to parse.
+            timestamp (int, optional): Time the readings were taken, in
+                milliseconds since the epoch. Defaults to the current time.
 
         Returns:
             records (dict): Measurements from the sensors along with metadata
             for InfluxDB.
         """
 
+        # epoch in milliseconds, the precision of the writes
+        if timestamp is None:
+            timestamp = time.time_ns() // 1_000_000
+
         # device name in the first json key
-        device = list(json_measurements.keys())[0]
+        device = next(iter(json_measurements))
         records = {
             'measurement': 'sensor_data',
             'tags': {'device': device},
-            'timestamp': str(datetime.datetime.now()),
+            'timestamp': timestamp,
         }
 
         records['fields'] = self._to_fields(json_measurements, device)
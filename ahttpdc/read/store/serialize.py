@@ -0,0 +1,86 @@
+"""Serialize parsed readings directly into InfluxDB line protocol.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import math
+
+__all__ = ['LineSerializer']
+
+# characters escaped in the measurement name, tag keys, tag values and
+# field keys, as required by the line protocol
+_ESCAPE_MEASUREMENT = str.maketrans(
+    {',': r'\,', ' ': r'\ ', '\n': r'\n', '\t': r'\t', '\r': r'\r'}
+)
+_ESCAPE_KEY = str.maketrans(
+    {
+        ',': r'\,',
+        '=': r'\=',
+        ' ': r'\ ',
+        '\n': r'\n',
+        '\t': r'\t',
+        '\r': r'\r',
+    }
+)
+
+
+class LineSerializer:
+    """Serialize records of JSONInfluxParser into line protocol bytes.
+
+    Escaped series prefixes (measurement with tags) and field keys are
+    cached, so serializing a reading only formats the values and the
+    timestamp. Timestamps are integer epochs in the precision of the
+    writes, non-finite values are skipped, as InfluxDB rejects them.
+
+        serializer = LineSerializer()
+        serializer.serialize(parser.parse(json_response))
+        # b'sensor_data,device=nodemcu co=2.56,co2=402.08 1715000000000'
+    """
+
+    def __init__(self) -> None:
+        self._series: dict[tuple, bytes] = {}
+        self._keys: dict[str, str] = {}
+
+    def _prefix(self, measurement: str, tags: dict[str, str]) -> bytes:
+        """Helper function, provides escaped measurement along with tags."""
+        key = (measurement, *tags.items())
+        prefix = self._series.get(key)
+        if prefix is None:
+            prefix = measurement.translate(_ESCAPE_MEASUREMENT) + ''.join(
+                f',{k.translate(_ESCAPE_KEY)}={str(v).translate(_ESCAPE_KEY)}'
+                for k, v in sorted(tags.items())
+                if v != ''
+            )
+            prefix = self._series[key] = f'{prefix} '.encode()
+        return prefix
+
+    def _key(self, field: str) -> str:
+        """Helper function, provides escaped field key with '='."""
+        key = self._keys.get(field)
+        if key is None:
+            key = self._keys[field] = f'{field.translate(_ESCAPE_KEY)}='
+        return key
+
+    def serialize(self, record: dict) -> bytes | None:
+        """Serialize the record into a single line of line protocol.
+
+        Args:
+            record (dict): Record with measurement, tags, fields and integer
+                timestamp, as returned by JSONInfluxParser.
+
+        Returns:
+            bytes | None: Serialized point or None, if it has no valid field.
+        """
+        fields = ','.join(
+            f'{self._key(field)}{value!r}'
+            for field, value in record['fields'].items()
+            if math.isfinite(value)
+        )
+        if not fields:
+            return None
+
+        return b'%s%s %d' % (
+            self._prefix(record['measurement'], record['tags']),
+            fields.encode(),
+            record['timestamp'],
+        )
@@ -0,0 +1,158 @@
+"""Append-only spool of points, which could not be written into InfluxDB.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import os
+import threading
+
+__all__ = ['Spool']
+
+
+class Spool:
+    """Durable, append-only storage of line protocol records on the disk.
+
+    Records are appended to segment files within the directory. Segment is
+    sealed once it exceeds segment_size bytes and a new one is started.
+    Segments are read back oldest first and removed, once their records
+    have been delivered. Segments left in the directory by a previous run
+    are picked up on creation.
+
+    If the spool grows beyond max_bytes, the oldest segments are discarded.
+
+    Args:
+        directory (str): Directory to keep the segments in.
+        segment_size (int, optional): Size of a single segment, in bytes.
+            Defaults to 4 MiB.
+        max_bytes (int, optional): Maximum size of the spool, in bytes.
+            Defaults to 1 GiB.
+    """
+
+    SUFFIX = '.lp'
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 4 * 1024**2,
+        max_bytes: int = 1024**3,
+    ) -> None:
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # appends may happen from multiple threads
+        self._lock = threading.Lock()
+
+        self._sizes: dict[str, int] = {
+            path: os.path.getsize(path) for path in self._list_segments()
+        }
+        self._sequence = max(
+            (self._sequence_of(path) for path in self._sizes), default=0
+        )
+        self._active: str | None = None
+
+    def _list_segments(self) -> list[str]:
+        """Helper function, lists segments present in the directory."""
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(self.SUFFIX)
+        )
+
+    def _sequence_of(self, path: str) -> int:
+        """Helper function, extracts sequence number of the segment."""
+        return int(os.path.basename(path)[: -len(self.SUFFIX)])
+
+    def _new_segment(self) -> str:
+        """Helper function, starts a new segment."""
+        self._sequence += 1
+        path = os.path.join(
+            self.directory, f'{self._sequence:012d}{self.SUFFIX}'
+        )
+        self._sizes[path] = 0
+        return path
+
+    def _enforce_limit(self):
+        """Discard the oldest segments, exceeding the size limit."""
+        while sum(self._sizes.values()) > self.max_bytes and self._sizes:
+            oldest = min(self._sizes)
+            print(
+                f'Spool exceeded {self.max_bytes} bytes, '
+                f'discarding segment {oldest}'
+            )
+            self._remove(oldest)
+
+    def _remove(self, path: str):
+        """Helper function, removes the segment."""
+        self._sizes.pop(path, None)
+        if path == self._active:
+            self._active = None
+        if os.path.exists(path):
+            os.remove(path)
+
+    @property
+    def size(self) -> int:
+        """Size of the spool, in bytes."""
+        return sum(self._sizes.values())
+
+    def empty(self) -> bool:
+        """Check if there are any records within the spool."""
+        return not any(self._sizes.values())
+
+    def append(self, lines: list[bytes]):
+        """Append the records to the active segment.
+
+        Records are flushed to the disk before the method returns.
+
+        Args:
+            lines (list[bytes]): Points serialized into line protocol.
+        """
+        data = b''.join(line + b'\n' for line in lines)
+
+        with self._lock:
+            if (
+                self._active is None
+                or self._sizes[self._active] >= self.segment_size
+            ):
+                self._active = self._new_segment()
+
+            with open(self._active, 'ab') as segment:
+                segment.write(data)
+                segment.flush()
+                os.fsync(segment.fileno())
+
+            self._sizes[self._active] += len(data)
+            self._enforce_limit()
+
+    def seal(self) -> list[str]:
+        """Seal the active segment and list every segment, oldest first.
+
+        Returns:
+            list[str]: Paths to the segments ready to be read.
+        """
+        with self._lock:
+            self._active = None
+            return sorted(self._sizes)
+
+    def read(self, path: str) -> list[bytes]:
+        """Read records from the segment.
+
+        Args:
+            path (str): Path to the segment.
+
+        Returns:
+            list[bytes]: Points serialized into line protocol.
+        """
+        with open(path, 'rb') as segment:
+            return [line for line in segment.read().split(b'\n') if line]
+
+    def remove(self, path: str):
+        """Remove the segment, once its records have been delivered.
+
+        Args:
+            path (str): Path to the segment.
+        """
+        with self._lock:
+            self._remove(path)
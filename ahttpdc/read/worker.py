@@ -0,0 +1,378 @@
+"""Worker process of the data daemon, polling a shard of the devices.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+from multiprocessing.connection import Connection
+
+import aiohttp
+
+from ahttpdc.read.device import Device
+from ahttpdc.read.fetch.decode import InvalidPayload
+from ahttpdc.read.fetch.fetcher import AsyncFetcher
+from ahttpdc.read.fetch.health import DeviceHealth
+from ahttpdc.read.pipeline import ReadingQueue
+from ahttpdc.read.schedule import FixedRateScheduler
+from ahttpdc.read.store.collector import AsyncCollector
+
+__all__ = ['DaemonWorker']
+
+
+class DaemonWorker:
+    """Fetch-store cycle of a shard of the devices, run on its own loop.
+
+    Each worker has its own fetcher, queue and collector, so its batches and
+    spool are independent of the other workers. Worker is run within a
+    process started by DataDaemon and controlled over a pipe, answering
+    'status', 'flush' and 'stop' commands.
+
+    Args:
+        sensors (dict): Which sensors device has and what do they measure.
+        db_url (str): URL address of the server with database.
+        db_token (str): InfluxDB token to authenticate the user.
+        db_org (str): Name of the InfluxDB organization
+        db_bucket (str): Name of the InfluxDB bucket.
+        devices (list[Device]): Devices polled by the worker.
+        max_concurrency (int, optional): Maximum number of requests sent to
+            the devices at the same time. Defaults to 64.
+        batch_size (int, optional): Number of points written to the database
+            in a single request. Defaults to 1.
+        flush_interval (float, optional): Maximum time, in seconds, points
+            are buffered before being written. Defaults to 1.
+        queue_size (int, optional): Number of fetched readings waiting to be
+            stored. Defaults to 1000.
+        backpressure (str, optional): What to do with new readings, when
+            the queue is full: 'block', 'drop-oldest' or 'spill'.
+            Defaults to 'block'.
+        spill_path (str, optional): File readings overflow into with the
+            'spill' policy. Defaults to a temporary file.
+        store_workers (int, optional): Number of coroutines storing the
+            readings. Defaults to 4.
+        spool_dir (str, optional): Directory to spool points, which could not
+            be written, and replay them later from. Defaults to None.
+        spool_max_bytes (int, optional): Maximum size of the spool on the
+            disk. Defaults to 1 GiB.
+        aggregation (str, optional): How readings of a parameter measured by
+            multiple sensors are combined: 'mean', 'median' or 'priority'.
+            Defaults to 'mean'.
+        failure_threshold (int, optional): Number of consecutive failed
+            requests, after which the device is only probed. Defaults to 5.
+        max_backoff (float, optional): Upper bound of the delay after a
+            failed request, in seconds. Defaults to 300.
+        probe_interval (float, optional): Time between the probes of a
+            failing device, in seconds. Defaults to 60.
+        adaptive_interval (bool, optional): Whether to poll devices less
+            often while their readings do not change. Defaults to False.
+        stages (list, optional): Stages the parsed records pass through
+            before being written, e.g. DeadbandFilter. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        sensors: dict[str, list[str]],
+        db_url: str,
+        db_token: str,
+        db_org: str,
+        db_bucket: str,
+        devices: list[Device],
+        max_concurrency: int = 64,
+        batch_size: int = 1,
+        flush_interval: float = 1,
+        queue_size: int = 1000,
+        backpressure: str = 'block',
+        spill_path: str | None = None,
+        store_workers: int = 4,
+        spool_dir: str | None = None,
+        spool_max_bytes: int = 1024**3,
+        aggregation: str = 'mean',
+        failure_threshold: int = 5,
+        max_backoff: float = 300,
+        probe_interval: float = 60,
+        adaptive_interval: bool = False,
+        stages: list | None = None,
+    ):
+        self.sensors = sensors
+        self.devices = devices
+        self.max_concurrency = max_concurrency
+
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self.spill_path = spill_path
+        self.store_workers = store_workers
+
+        self.failure_threshold = failure_threshold
+        self.max_backoff = max_backoff
+        self.probe_interval = probe_interval
+        self.adaptive_interval = adaptive_interval
+
+        # set up within the worker process
+        self._limit: asyncio.Semaphore | None = None
+        self._queue: ReadingQueue | None = None
+        self._schedulers: dict[str, FixedRateScheduler] = {}
+        self._health: dict[str, DeviceHealth] = {}
+        self._channel: Connection | None = None
+
+        self._fetcher = AsyncFetcher(
+            limit=self.max_concurrency, sensors=self.sensors
+        )
+
+        self._db_url = db_url
+        self._token = db_token
+        self._org = db_org
+        self._bucket = db_bucket
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+        self.spool_max_bytes = spool_max_bytes
+        self.aggregation = aggregation
+        self.stages = stages
+
+        # created by every run of the worker, so a restarted worker picks up
+        # the spool as left on the disk
+        self._collector: AsyncCollector | None = None
+
+    def _new_collector(self) -> AsyncCollector:
+        """Helper function, provides collector of the worker."""
+        return AsyncCollector(
+            self.sensors,
+            self._db_url,
+            self._token,
+            self._org,
+            self._bucket,
+            batch_size=self.batch_size,
+            flush_interval=self.flush_interval,
+            spool_dir=self.spool_dir,
+            spool_max_bytes=self.spool_max_bytes,
+            aggregation=self.aggregation,
+            stages=self.stages,
+        )
+
+    def _failed(self, device: Device, health: DeviceHealth, sent, error):
+        """Helper method, records and reports failed request."""
+        if health.failure(sent):
+            print(
+                f'{device.name} failed {health.failures} times in a row, '
+                f'probing every {health.probe_interval}s: {error!r}'
+            )
+        elif health.state == 'closed':
+            print(f'Error polling {device.name}: {error!r}')
+
+    async def _fetch(self, device: Device, health: DeviceHealth):
+        """Request sensor readings and pass them on to the storing stage.
+
+        Timeouts, connection errors, error responses and malformed payloads
+        are recorded as failures of the device.
+
+        Args:
+            device (Device): Device to request the readings from.
+            health (DeviceHealth): Health of the device.
+        """
+        sent = asyncio.get_running_loop().time()
+        try:
+            async with self._limit:
+                reading = await self._fetcher.capture(device.url)
+        except (TimeoutError, aiohttp.ClientError, InvalidPayload) as e:
+            self._failed(device, health, sent, e)
+            return
+
+        if reading is None:
+            self._failed(device, health, sent, 'error response')
+            return
+
+        if health.success(sent, reading.payload):
+            print(f'{device.name} is responding again')
+        await self._queue.put(reading)
+
+    async def _background_loop(self, device: Device):
+        """Start main loop of the worker for a single device.
+
+        Requests are sent at a fixed rate, regardless of how long they take.
+        Ticks missed due to slow requests are reported. Ticks are skipped
+        while the device backs off after failures or, with adaptive
+        interval, while its readings do not change. Exceptions are reported
+        and contained within the loop, so one failing device does not bring
+        down the others.
+
+        Args:
+            device (Device): Device to poll.
+        """
+        scheduler = FixedRateScheduler(
+            device.interval, device.phase, device.jitter
+        )
+        health = DeviceHealth(
+            device.interval,
+            failure_threshold=self.failure_threshold,
+            max_backoff=self.max_backoff,
+            probe_interval=self.probe_interval,
+            adaptive=self.adaptive_interval,
+        )
+        self._schedulers[device.name] = scheduler
+        self._health[device.name] = health
+
+        loop = asyncio.get_running_loop()
+        async for missed in scheduler:
+            if missed:
+                print(
+                    f'Polling {device.name} missed {missed} ticks '
+                    f'({scheduler.missed} in total)'
+                )
+            if not health.ready(loop.time()):
+                continue
+
+            try:
+                await self._fetch(device, health)
+            except Exception as e:
+                print(f'Error polling {device.name}: {e!r}')
+
+    async def _store_loop(self):
+        """Store readings fetched by the background loops.
+
+        Runs independently of the polling, so a slow database does not delay
+        the next request. Readings are stored with the time they were
+        captured, however long they waited in the queue.
+        """
+        while True:
+            reading = await self._queue.get()
+            try:
+                await self._collector.store_readings(
+                    reading.payload, reading.timestamp
+                )
+            except Exception as e:
+                print(f'Error storing readings: {e!r}')
+            finally:
+                self._queue.task_done()
+
+    def _status(self) -> dict:
+        """Helper function, gathers statistics of the running worker."""
+        return {
+            'devices': {
+                name: {
+                    'ticks': scheduler.ticks,
+                    'missed': scheduler.missed,
+                    'state': self._health[name].state,
+                    'skipped': self._health[name].skipped,
+                }
+                for name, scheduler in self._schedulers.items()
+            },
+            'queued': self._queue.qsize(),
+            'dropped': self._queue.dropped,
+            'spilled': self._queue.spilled,
+            'buffered': self._collector.buffered,
+            'spooled': self._collector.spooled,
+        }
+
+    async def _drain(self):
+        """Store readings queued so far and write every buffered point.
+
+        Readings queued after the call are not waited for, so draining
+        finishes under sustained load as well.
+        """
+        await self._queue.join(self._queue.mark())
+        await self._collector.flush()
+
+    async def _reply_drained(self, request: int):
+        """Helper function, answers 'flush' once the worker is drained."""
+        await self._drain()
+        self._channel.send((request, self._status()))
+
+    async def _serve(self) -> int | None:
+        """Answer the commands sent over the control channel.
+
+        Commands are sent as (request, command) tuples and answered with
+        (request, reply) tuples. 'flush' is answered in the background, so
+        other commands are served while the worker drains.
+
+        Returns:
+            int | None: Request of 'stop' or None, if the parent closed the
+                channel.
+        """
+        loop = asyncio.get_running_loop()
+        readable = asyncio.Event()
+        loop.add_reader(self._channel.fileno(), readable.set)
+
+        try:
+            while True:
+                await readable.wait()
+                readable.clear()
+
+                while self._channel.poll():
+                    try:
+                        request, command = self._channel.recv()
+                    except EOFError:
+                        return None
+
+                    if command == 'stop':
+                        return request
+                    elif command == 'flush':
+                        task = asyncio.create_task(
+                            self._reply_drained(request)
+                        )
+                        self._flushes.add(task)
+                        task.add_done_callback(self._flushes.discard)
+                    elif command == 'status':
+                        self._channel.send((request, self._status()))
+                    else:
+                        self._channel.send(
+                            (
+                                request,
+                                {'error': f'Unknown command {command!r}'},
+                            )
+                        )
+        finally:
+            loop.remove_reader(self._channel.fileno())
+
+    def run(self, channel: Connection):
+        """Run the worker until 'stop' is received over the channel.
+
+        Args:
+            channel (Connection): End of the control channel of the worker.
+        """
+        self._channel = channel
+        asyncio.run(self._schedule_daemon())
+
+    async def _schedule_daemon(self):
+        """Schedule the fetching and storing coroutines.
+
+        Runs until 'stop' is received over the control channel. Polling is
+        then stopped, queued readings are stored and buffered points are
+        written, before the final status is sent back.
+        """
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._queue = ReadingQueue(
+            self.queue_size, self.backpressure, self.spill_path
+        )
+        self._flushes: set[asyncio.Task] = set()
+        self._collector = self._new_collector()
+
+        try:
+            async with self._fetcher, self._collector:
+                async with asyncio.TaskGroup() as tg:
+                    workers = [
+                        tg.create_task(self._store_loop())
+                        for _ in range(self.store_workers)
+                    ]
+                    pollers = [
+                        tg.create_task(self._background_loop(device))
+                        for device in self.devices
+                    ]
+
+                    request = await self._serve()
+
+                    for task in pollers:
+                        task.cancel()
+                    await self._queue.join()
+                    # pending flushes are answered before the final status
+                    await asyncio.gather(*self._flushes)
+                    for task in workers:
+                        task.cancel()
+            # points buffered by the collector are written on close, the
+            # parent, which closed the channel, gets no final status
+            if request is not None:
+                try:
+                    self._channel.send((request, self._status()))
+                except OSError:
+                    pass
+        finally:
+            self._queue.close()
@@ -0,0 +1,70 @@
+"""
+Test class for PayloadDecoder.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import pytest
+
+from ahttpdc.read.fetch.decode import InvalidPayload, PayloadDecoder
+
+
+class TestPayloadDecoder:
+    """Test class for PayloadDecoder class from ahttpdc.read.fetch.decode
+    module."""
+
+    def set_up(self, backend='json'):
+        """Set the PayloadDecoder object up for testing."""
+        self.decoder = PayloadDecoder(
+            {'mq135': ['co', 'co2'], 'dht22': ['humidity']}, backend
+        )
+
+    def test_decode_converts_readings(self):
+        """Test if selected readings are converted to floats."""
+        self.set_up()
+        payload = self.decoder.decode(
+            b'{"dev": {"mq135": {"co": "2.5", "co2": "400"},'
+            b' "dht22": {"humidity": "41.0"}}}'
+        )
+        assert payload['dev']['mq135'] == {'co': 2.5, 'co2': 400.0}
+        assert payload['dev']['dht22']['humidity'] == 41.0
+
+    @pytest.mark.parametrize(
+        'data',
+        [
+            b'{"dev": {"mq135"',
+            b'[1, 2]',
+            b'{"dev": {"mq135": {"co": "1", "co2": "2"}}}',
+            b'{"dev": {"mq135": {"co": "1"}, "dht22": {"humidity": "1"}}}',
+            b'{"dev": {"mq135": {"co": "x", "co2": "2"},'
+            b' "dht22": {"humidity": "1"}}}',
+        ],
+    )
+    def test_decode_rejects_invalid(self, data):
+        """Test if malformed or incomplete payloads are rejected."""
+        self.set_up()
+        with pytest.raises(InvalidPayload):
+            self.decoder.decode(data)
+
+    @pytest.mark.parametrize(
+        'data',
+        [
+            b'{"dev": {"mq135": {"co": "2.5", "co2": "400"},'
+            b' "dht22": {"humidity": "41.0"}}}',
+            # keys besides the sensors and readings of other types
+            b'{"dev": {"uptime": 5, "ok": true, "ip": "10.0.0.2",'
+            b' "mq135": {"co": 2.5, "co2": "400", "calibrated": false},'
+            b' "dht22": {"humidity": "41.0", "errors": [1, 2]}}}',
+        ],
+    )
+    def test_backends_agree(self, data):
+        """Test if every installed backend produces the same payload."""
+        self.set_up('json')
+        expected = self.decoder.decode(data)
+
+        for backend in ('orjson', 'msgspec'):
+            try:
+                self.set_up(backend)
+            except ImportError:
+                continue
+            assert self.decoder.decode(data) == expected
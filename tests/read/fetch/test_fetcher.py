@@ -4,6 +4,8 @@ Test class for AsyncFetcher.
 Author: Piotr Krzysztof Lis - github.com/straightchlorine
 """
 
+import time
+
 import pytest
 
 from ahttpdc.read.fetch.fetcher import AsyncFetcher
@@ -33,3 +35,26 @@ class TestAsyncFetcher:
         self.set_up()
         request = await self.fetcher.request_readings()
         assert isinstance(request, dict)
+
+    @pytest.mark.asyncio
+    async def test_request_shared_session(self):
+        """Test if the shared session is reused and closed properly."""
+        self.set_up()
+        async with self.fetcher as fetcher:
+            first = await fetcher.request_readings()
+            second = await fetcher.request_readings(self.dev_url)
+            session = fetcher._session
+
+        assert first == second
+        assert session is not None and session.closed
+
+    @pytest.mark.asyncio
+    async def test_capture(self):
+        """Test if the reading is stamped with the time of the request."""
+        self.set_up()
+        sent = time.time_ns()
+        reading = await self.fetcher.capture()
+        received = time.time_ns()
+
+        assert isinstance(reading.payload, dict)
+        assert sent // 10**6 <= reading.timestamp <= received // 10**6
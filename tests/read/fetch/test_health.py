@@ -0,0 +1,71 @@
+"""
+Test class for DeviceHealth.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from ahttpdc.read.fetch.health import DeviceHealth
+
+
+class TestDeviceHealth:
+    """Test class for DeviceHealth class from ahttpdc.read.fetch.health
+    module."""
+
+    def test_backoff(self):
+        """Test if the delay grows exponentially after failures."""
+        health = DeviceHealth(1, failure_threshold=10, max_backoff=10)
+
+        assert health.ready(0)
+        health.failure(0)
+        assert not health.ready(1)
+        assert health.ready(2)
+
+        health.failure(2)
+        assert not health.ready(5)
+        assert health.ready(6)
+
+        health.failure(6)
+        assert not health.ready(13)
+        assert health.ready(14)
+
+        # capped by max_backoff
+        health.failure(14)
+        assert health.ready(24)
+
+    def test_circuit_breaker(self):
+        """Test if failing device is only probed until it recovers."""
+        health = DeviceHealth(1, failure_threshold=2, probe_interval=60)
+
+        health.failure(0)
+        assert health.failure(2), 'circuit not opened'
+        assert health.state == 'open'
+        assert not health.ready(30)
+
+        # failed probe keeps the circuit open
+        assert health.ready(62) and health.state == 'half-open'
+        assert not health.failure(62)
+        assert health.state == 'open'
+
+        assert health.ready(122)
+        assert health.success(122), 'circuit not closed'
+        assert health.state == 'closed' and health.failures == 0
+        assert health.ready(123)
+
+    def test_adaptive_interval(self):
+        """Test if unchanged readings are polled less often."""
+        health = DeviceHealth(1, adaptive=True, max_stretch=4)
+        readings = {'nodemcu': {'mq135': {'co': 2.5}}}
+
+        health.success(0, readings)
+        health.success(1, readings)
+        assert health.stretch == 2
+        assert not health.ready(2)
+        assert health.ready(3)
+
+        health.success(3, readings)
+        health.success(7, readings)
+        assert health.stretch == 4
+
+        health.success(11, {'nodemcu': {'mq135': {'co': 2.6}}})
+        assert health.stretch == 1
+        assert health.ready(12)
@@ -0,0 +1,30 @@
+"""
+Test class for Reading and MonotonicClock.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import time
+
+from ahttpdc.read.fetch.reading import MonotonicClock, Reading
+
+
+class TestReading:
+    """Test class for classes from ahttpdc.read.fetch.reading module."""
+
+    def test_timestamp(self):
+        """Test if the reading is stamped with the midpoint of the request."""
+        reading = Reading({}, 1_000_000_000, 1_004_000_000)
+        assert reading.timestamp == 1_002
+        assert reading.latency == 4_000_000
+
+    def test_clock(self, monkeypatch):
+        """Test if the clock ignores steps of the wall-clock time."""
+        clock = MonotonicClock()
+        before = clock.now()
+
+        # system clock stepped back by an hour
+        wall = time.time_ns() - 3600 * 10**9
+        monkeypatch.setattr(time, 'time_ns', lambda: wall)
+
+        assert clock.now() >= before
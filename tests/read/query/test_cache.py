@@ -0,0 +1,55 @@
+"""
+Test class for QueryCache.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import time
+
+import pandas as pd
+
+from ahttpdc.read.query.cache import QueryCache
+
+
+class TestQueryCache:
+    """Test class for the QueryCache class."""
+
+    @staticmethod
+    def frame(rows: int) -> pd.DataFrame:
+        """Create a frame of given number of rows."""
+        return pd.DataFrame({'co': [1.0] * rows})
+
+    def test_hit(self):
+        """Test if the stored frame is returned."""
+        cache = QueryCache()
+        frame = self.frame(10)
+        cache.put(('historical', '-1d', ''), frame)
+
+        assert cache.get(('historical', '-1d', '')) is frame
+        assert cache.get(('historical', '-2d', '')) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_ttl(self):
+        """Test if the entries expire, also after being updated."""
+        cache = QueryCache(ttl=0.05)
+        cache.put(('a',), self.frame(1))
+        time.sleep(0.06)
+        cache.put(('a',), self.frame(2), keep_age=True)
+
+        assert cache.get(('a',)) is None
+        assert cache.size == 0
+
+    def test_lru_eviction(self):
+        """Test if the least recently used entries are evicted."""
+        size = int(self.frame(100).memory_usage(index=True).sum())
+        cache = QueryCache(max_bytes=2 * size)
+
+        cache.put(('a',), self.frame(100))
+        cache.put(('b',), self.frame(100))
+        cache.get(('a',))
+        cache.put(('c',), self.frame(100))
+
+        assert cache.get(('b',)) is None
+        assert cache.get(('a',)) is not None
+        assert cache.get(('c',)) is not None
+        assert cache.size <= 2 * size
@@ -0,0 +1,97 @@
+"""
+Test class for DataParser.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from influxdb_client.client.flux_table import FluxRecord, FluxTable, TableList
+
+from ahttpdc.read.query.parse.data import DataParser, local_offset
+
+
+class TestDataParser:
+    """Test class for the DataParser class."""
+
+    start = datetime(2024, 5, 16, tzinfo=timezone.utc)
+
+    def table(self, field: str, values: list[float]) -> FluxTable:
+        """Create a table of records of a single field, one per second."""
+        table = FluxTable()
+        for i, value in enumerate(values):
+            table.records.append(
+                FluxRecord(
+                    0,
+                    {
+                        '_time': self.start + timedelta(seconds=i),
+                        '_field': field,
+                        '_value': value,
+                    },
+                )
+            )
+        return table
+
+    def test_into_dataframe(self):
+        """Test if the records are pivoted into columns per field."""
+        tables = TableList()
+        tables.append(self.table('co', [3.0, 2.0, 1.0]))
+        tables.append(self.table('co2', [400.0, 401.0]))
+
+        df = DataParser(tables).into_dataframe()
+
+        assert list(df.columns) == ['co', 'co2']
+        assert df['co'].tolist() == [3.0, 2.0, 1.0]
+        assert df['co2'].iloc[:2].tolist() == [400.0, 401.0]
+        assert df['co2'].isna().iloc[2]
+
+        assert df.index.is_monotonic_increasing
+        assert df.index[0] == self.start + local_offset()
+
+    def test_empty(self):
+        """Test if no records result in an empty DataFrame."""
+        assert DataParser(TableList()).into_dataframe().empty
+
+    def test_pivoted(self):
+        """Test if records pivoted by the database are parsed as rows."""
+        records = [
+            FluxRecord(
+                0,
+                {
+                    'result': '_result',
+                    'table': 0,
+                    '_time': self.start + timedelta(seconds=i),
+                    'device': 'nodemcu',
+                    'co': 2.5 + i,
+                    'co2': 400.0,
+                },
+            )
+            for i in range(3)
+        ]
+
+        df = DataParser.from_records(records).into_dataframe()
+
+        assert list(df.columns) == ['device', 'co', 'co2']
+        assert df['co'].tolist() == [2.5, 3.5, 4.5]
+        assert df['co2'].dtype == 'float64'
+        assert df.index[0] == self.start + local_offset()
+
+    def test_pivoted_devices(self):
+        """Test if rows of the devices sharing a timestamp are all kept."""
+        records = [
+            FluxRecord(
+                0,
+                {
+                    '_time': self.start,
+                    'device': device,
+                    'co': co,
+                },
+            )
+            for device, co in (('nodemcu', 1.0), ('esp32', 2.0))
+        ]
+
+        df = DataParser.from_records(records).into_dataframe()
+
+        assert len(df) == 2
+        assert df['device'].tolist() == ['nodemcu', 'esp32']
+        assert df['co'].tolist() == [1.0, 2.0]
@@ -0,0 +1,297 @@
+"""
+Test class for AsyncQuery, with the database replaced by stubs.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+
+from ahttpdc.read.query.interface import AsyncQuery, InvalidInterval
+from ahttpdc.read.query.parse.data import local_offset
+from ahttpdc.read.query.timerange import parse_time, rfc3339
+
+
+class TestAsyncQueryStubbed:
+    """Test class for the queries generated by AsyncQuery, answered by stubs
+    instead of the database."""
+
+    def set_up(self, **kwargs):
+        """Set the AsyncQuery object up, recording the sent queries."""
+        self.query = AsyncQuery(
+            {'mq135': ['co', 'co2']},
+            'http://localhost:1',
+            'token',
+            'org',
+            'bucket',
+            **kwargs,
+        )
+        self.sent: list[str] = []
+        self.responses: list[pd.DataFrame] = []
+
+        async def respond(query: str) -> pd.DataFrame:
+            self.sent.append(query)
+            if self.responses:
+                return self.responses.pop(0)
+            return pd.DataFrame()
+
+        self.query.custom_sync = respond
+        self.query.custom_async = respond
+
+    @staticmethod
+    def frame(*times: str) -> pd.DataFrame:
+        """Create a frame with a row at every given time."""
+        return pd.DataFrame(
+            {'co': [1.0] * len(times)}, index=pd.DatetimeIndex(times)
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('start', ['-1mo', '-1y', 'now()'])
+    async def test_cached_flux_start(self, start):
+        """Test if starts resolved only by Flux bypass the cache."""
+        self.set_up(cache_ttl=60)
+        self.responses = [self.frame('2024-01-01'), self.frame('2024-01-01')]
+
+        for _ in range(2):
+            df = await self.query.historical(start)
+            assert len(df) == 1
+
+        assert len(self.sent) == 2
+        assert all(f'range(start: {start})' in q for q in self.sent)
+
+    @pytest.mark.asyncio
+    async def test_cached_late_rows(self):
+        """Test if the refresh of the cache picks up rows written late."""
+        self.set_up(cache_ttl=60)
+        now = pd.Timestamp.now(tz='UTC').floor('s')
+        first, last = now - pd.Timedelta('10min'), now - pd.Timedelta('5min')
+
+        def rows(*readings: tuple[pd.Timestamp, str]) -> pd.DataFrame:
+            times, devices = zip(*readings)
+            return pd.DataFrame(
+                {'device': list(devices), 'co': [1.0] * len(readings)},
+                index=pd.DatetimeIndex(times) + local_offset(),
+            )
+
+        self.responses = [
+            rows((first, 'a'), (first, 'b'), (last, 'a')),
+            # row of device b at the cached last timestamp arrives late
+            rows((last, 'a'), (last, 'b')),
+        ]
+
+        assert len(await self.query.historical('-1h')) == 3
+        df = await self.query.historical('-1h')
+
+        since = rfc3339(last - pd.Timedelta(AsyncQuery.GRACE, 's'))
+        assert f'range(start: {since})' in self.sent[-1]
+        assert df['device'].tolist() == ['a', 'b', 'a', 'b']
+        assert df.index.is_monotonic_increasing
+
+    def test_shards_boundaries(self):
+        """Test if the shards cover the interval without gaps or overlaps."""
+        self.set_up()
+        shards = self.query._shards(
+            '2024-01-01T00:00:00Z', '2024-01-01T03:00:00Z', 3
+        )
+
+        assert len(shards) == 3
+        assert parse_time(shards[0][0]) == parse_time('2024-01-01T00:00:00Z')
+        assert parse_time(shards[-1][1]) == parse_time('2024-01-01T03:00:00Z')
+        for (_, stop), (start, _) in zip(shards[:-1], shards[1:]):
+            assert stop == start
+        assert parse_time(shards[1][0]) == parse_time('2024-01-01T01:00:00Z')
+
+    @pytest.mark.parametrize(
+        'start, end, shards',
+        [
+            ('2024-01-02T00:00:00Z', '2024-01-01T00:00:00Z', 2),
+            ('-1d', '', 0),
+        ],
+    )
+    def test_shards_invalid(self, start, end, shards):
+        """Test if invalid intervals are rejected."""
+        self.set_up()
+        with pytest.raises(InvalidInterval):
+            self.query._shards(start, end, shards)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('start', ['-1mo', '-1y', 'now()'])
+    async def test_sharded_flux_start(self, start):
+        """Test if starts only Flux resolves are queried unsharded."""
+        self.set_up()
+        self.responses = [self.frame('2024-01-01')]
+        df = await self.query.historical_sharded(start, shards=4)
+
+        assert len(df) == 1
+        assert len(self.sent) == 1
+        assert f'range(start: {start})' in self.sent[0]
+
+    @pytest.mark.asyncio
+    async def test_aggregated_merges_devices(self):
+        """Test if the devices are merged before the windows aggregate."""
+        self.set_up()
+        await self.query.aggregated('-1d', window='1h', fn='last')
+
+        query = self.sent[0]
+        merge = query.index('group(columns: ["_field"])')
+        assert merge < query.index('sort(') < query.index('aggregateWindow(')
+        assert merge < query.index('pivot(')
+
+    @pytest.mark.asyncio
+    async def test_pivot_keeps_devices(self):
+        """Test if the rows of the devices are pivoted separately."""
+        self.set_up()
+        await self.query.historical('-1d')
+        await self.query.latest()
+
+        for query in self.sent:
+            assert 'keep(columns: ["_time", "device",' in query
+            assert 'pivot(rowKey: ["_time", "device"]' in query
+
+    @pytest.mark.asyncio
+    async def test_latest_row_per_device(self):
+        """Test if fields last written at different times are collapsed
+        into a single row per device."""
+        self.set_up()
+        first = pd.Timestamp('2024-01-01T10:00:00')
+        last = pd.Timestamp('2024-01-01T10:00:30')
+        self.responses = [
+            pd.DataFrame(
+                {
+                    'device': ['a', 'b', 'a'],
+                    'co': [1.0, 2.0, float('nan')],
+                    'co2': [float('nan'), float('nan'), 400.0],
+                },
+                index=pd.DatetimeIndex([first, first, last], name='time'),
+            )
+        ]
+
+        df = await self.query.latest()
+
+        assert df['device'].tolist() == ['b', 'a']
+        assert df.index.tolist() == [first, last]
+        assert df['co'].tolist() == [2.0, 1.0]
+        assert df['co2'].iloc[1] == 400.0
+        assert df['co2'].isna().iloc[0]
+
+    def test_loop_change_closes_client(self):
+        """Test if the client of the previous loop is closed."""
+        self.set_up()
+        first = asyncio.run(self.query._async_client())
+
+        closed = []
+        close = first.close
+
+        async def record():
+            closed.append(first)
+            await close()
+
+        first.close = record
+        second = asyncio.run(self.query._async_client())
+
+        assert second is not first
+        assert closed == [first]
+        asyncio.run(self.query.close())
+
+    @pytest.mark.asyncio
+    async def test_tail_cursor(self):
+        """Test if tail() queries only the rows after its cursor."""
+        self.set_up()
+
+        # rows are indexed with the local time, as returned by DataParser
+        def rows(*times: str) -> pd.DataFrame:
+            frame = self.frame(*times)
+            frame.index = frame.index.tz_localize('UTC') + local_offset()
+            return frame
+
+        self.responses = [
+            rows('2024-01-01T10:00:00', '2024-01-01T10:00:01'),
+            rows(),
+            rows('2024-01-01T10:00:02'),
+        ]
+        # queries start the grace period before the cursor
+        after = 'range(start: 2024-01-01T09:59:01.000000000Z)'
+
+        assert len(await self.query.tail()) == 2
+        assert 'range(start: -1h)' in self.sent[-1]
+
+        # empty response keeps the cursor
+        assert (await self.query.tail()).empty
+        assert after in self.sent[-1]
+        assert len(await self.query.tail()) == 1
+        assert after in self.sent[-1]
+
+        # subscribers have their own cursors
+        await self.query.tail('other', start='-5m')
+        assert 'range(start: -5m)' in self.sent[-1]
+
+        self.query.reset_tail()
+        await self.query.tail()
+        assert 'range(start: -1h)' in self.sent[-1]
+
+    @pytest.mark.asyncio
+    async def test_tail_late_rows(self):
+        """Test if tail() returns rows written after newer ones, once."""
+        self.set_up()
+
+        def rows(*readings: tuple[str, str]) -> pd.DataFrame:
+            times, devices = zip(*readings) if readings else ((), ())
+            frame = self.frame(*times)
+            frame.index = frame.index.tz_localize('UTC') + local_offset()
+            frame.insert(0, 'device', list(devices))
+            return frame
+
+        self.responses = [
+            rows(('2024-01-01T10:00:00', 'a'), ('2024-01-01T10:00:05', 'a')),
+            # older row of another device arrives late
+            rows(
+                ('2024-01-01T10:00:00', 'a'),
+                ('2024-01-01T10:00:03', 'b'),
+                ('2024-01-01T10:00:05', 'a'),
+                ('2024-01-01T10:00:05', 'b'),
+            ),
+            rows(
+                ('2024-01-01T10:00:03', 'b'),
+                ('2024-01-01T10:00:05', 'a'),
+                ('2024-01-01T10:00:05', 'b'),
+                ('2024-01-01T10:00:06', 'a'),
+            ),
+        ]
+
+        assert len(await self.query.tail(grace=10)) == 2
+
+        late = await self.query.tail(grace=10)
+        assert 'range(start: 2024-01-01T09:59:55.000000000Z)' in self.sent[-1]
+        assert late['device'].tolist() == ['b', 'b']
+        assert (
+            late.index[0]
+            == pd.Timestamp('2024-01-01T10:00:03', tz='UTC') + local_offset()
+        )
+
+        # rows already returned are not returned again
+        latest = await self.query.tail(grace=10)
+        assert latest['device'].tolist() == ['a']
+        assert len(latest) == 1
+
+    @pytest.mark.asyncio
+    async def test_close_waits_without_blocking(self):
+        """Test if close() waits for running queries off the loop."""
+        self.set_up()
+        del self.query.custom_sync
+
+        release = threading.Event()
+        self.query._query_sync = lambda client, query: release.wait(1)
+        query = asyncio.create_task(self.query.custom_sync('buckets()'))
+        await asyncio.sleep(0.05)
+
+        close = asyncio.create_task(self.query.close())
+        await asyncio.sleep(0.05)
+        assert not close.done(), 'close() did not wait for the query'
+
+        # loop still runs other tasks while close() waits
+        release.set()
+        await asyncio.wait_for(close, 1)
+        assert await query is True
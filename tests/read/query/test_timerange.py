@@ -0,0 +1,33 @@
+"""
+Test class for conversions of Flux time literals.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from datetime import timedelta
+
+import pandas as pd
+
+from ahttpdc.read.query.timerange import parse_duration, parse_time, rfc3339
+
+
+class TestTimeRange:
+    """Test class for the ahttpdc.read.query.timerange module."""
+
+    def test_parse_duration(self):
+        """Test parsing of the Flux duration literals."""
+        assert parse_duration('-30d') == timedelta(days=-30)
+        assert parse_duration('1h30m') == timedelta(minutes=90)
+        assert parse_duration('-500ms') == timedelta(milliseconds=-500)
+        assert parse_duration('2024-05-16T00:00:00Z') is None
+
+    def test_parse_time(self):
+        """Test resolving of relative and absolute times."""
+        now = pd.Timestamp('2024-05-16T12:00:00Z')
+        assert parse_time('-12h', now) == pd.Timestamp('2024-05-16T00:00:00Z')
+        assert parse_time('2024-05-16T00:00:00Z') == now - timedelta(hours=12)
+
+    def test_rfc3339(self):
+        """Test formatting of the time literals."""
+        time = pd.Timestamp('2024-05-16T00:00:00.5+02:00')
+        assert rfc3339(time) == '2024-05-15T22:00:00.500000000Z'
@@ -0,0 +1,53 @@
+"""
+Test class for JSONInfluxParser.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import pytest
+
+from ahttpdc.read.store.parse.parser import JSONInfluxParser
+
+
+class TestJSONInfluxParser:
+    """Test class for JSONInfluxParser class from
+    ahttpdc.read.store.parse.parser module."""
+
+    def set_up(self, aggregation='mean'):
+        """Set the JSONInfluxParser object up for testing."""
+        self.parser = JSONInfluxParser(
+            {
+                'bmp180': ['temperature', 'pressure'],
+                'ds18b20': ['temperature'],
+                'dht22': ['temperature', 'humidity'],
+            },
+            aggregation,
+        )
+        self.json = {
+            'nodemcu': {
+                'bmp180': {'temperature': '20.00', 'pressure': '1006.13'},
+                'ds18b20': {'temperature': '21.00'},
+                'dht22': {'temperature': '25.00', 'humidity': '47.30'},
+            }
+        }
+
+    @pytest.mark.parametrize(
+        'aggregation, temperature',
+        [('mean', 22.0), ('median', 21.0), ('priority', 20.0)],
+    )
+    def test_aggregation(self, aggregation, temperature):
+        """Test if readings of multiple sensors are combined correctly."""
+        self.set_up(aggregation)
+        record = self.parser.parse(self.json)
+
+        assert record['tags'] == {'device': 'nodemcu'}
+        assert record['fields'] == {
+            'temperature': temperature,
+            'pressure': 1006.13,
+            'humidity': 47.3,
+        }
+
+    def test_unknown_aggregation(self):
+        """Test if an unknown aggregation is rejected."""
+        with pytest.raises(ValueError):
+            self.set_up('mode')
@@ -0,0 +1,89 @@
+"""
+Test class for WindowAggregator.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import pytest
+
+from ahttpdc.read.store.aggregate import WindowAggregator
+
+
+def record(timestamp, **fields):
+    """Record of JSONInfluxParser with given fields."""
+    return {
+        'measurement': 'sensor_data',
+        'tags': {'device': 'nodemcu'},
+        'timestamp': timestamp,
+        'fields': fields,
+    }
+
+
+class TestWindowAggregator:
+    """Test class for WindowAggregator class from
+    ahttpdc.read.store.aggregate module."""
+
+    def test_window(self):
+        """Test if a summary is emitted once the window is over."""
+        aggregator = WindowAggregator(1, capacity=4)
+
+        output = []
+        for i, co in enumerate([2.0, 4.0, 9.0, 1.0, 3.0, 5.0]):
+            output += aggregator.process(record(1000 + i * 150, co=co))
+        assert output == []
+
+        output = aggregator.process(record(2000, co=1.0, co2=400.0))
+        assert output == [
+            record(1000, co=4.0, co_min=1.0, co_max=9.0, co_count=6.0)
+        ]
+
+        assert aggregator.flush() == [
+            record(
+                2000,
+                co=1.0,
+                co_min=1.0,
+                co_max=1.0,
+                co_count=1.0,
+                co2=400.0,
+                co2_min=400.0,
+                co2_max=400.0,
+                co2_count=1.0,
+            )
+        ]
+        assert aggregator.flush() == []
+
+    def test_missing_fields(self):
+        """Test if fields missing from some records are counted correctly."""
+        aggregator = WindowAggregator(60)
+        aggregator.process(record(0, co=1.0))
+        aggregator.process(record(1000, co=3.0, nh4=5.0))
+
+        (summary,) = aggregator.flush()
+        assert summary['fields']['co_count'] == 2.0
+        assert summary['fields']['nh4'] == 5.0
+        assert summary['fields']['nh4_count'] == 1.0
+
+    def test_flush_ended(self):
+        """Test if only the windows, which ended, are emitted on time."""
+        aggregator = WindowAggregator(1)
+        aggregator.process(record(1000, co=1.0))
+        aggregator.process(record(1500, co=3.0))
+
+        # window is still in progress
+        assert aggregator.flush(1999) == []
+
+        assert aggregator.flush(2100) == [
+            record(1000, co=2.0, co_min=1.0, co_max=3.0, co_count=2.0)
+        ]
+        assert aggregator.flush(5000) == []
+
+        # next record of the device starts a new window
+        aggregator.process(record(5200, co=4.0))
+        (summary,) = aggregator.flush()
+        assert summary['timestamp'] == 5000
+        assert summary['fields']['co_count'] == 1.0
+
+    def test_invalid_window(self):
+        """Test if non-positive window is rejected."""
+        with pytest.raises(ValueError):
+            WindowAggregator(0)
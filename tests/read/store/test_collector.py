@@ -0,0 +1,171 @@
+"""
+Test class for the write batching of AsyncCollector.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+
+from influxdb_client.rest import ApiException
+import pytest
+
+from ahttpdc.read.store.aggregate import WindowAggregator
+from ahttpdc.read.store.collector import AsyncCollector
+
+
+class TestAsyncCollector:
+    """Test class for AsyncCollector class from ahttpdc.read.store.collector
+    module, with the writes into the database replaced by a stub."""
+
+    def set_up(self, **kwargs):
+        """Set the AsyncCollector object up, recording the written batches."""
+        self.collector = AsyncCollector(
+            {'mq135': ['co', 'co2']},
+            'http://localhost:1',
+            'token',
+            'org',
+            'bucket',
+            **kwargs,
+        )
+        self.batches: list[list[bytes]] = []
+        self.writing = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+        async def write(lines: list[bytes]):
+            self.writing += 1
+            await self.release.wait()
+            self.writing -= 1
+            self.batches.append(lines)
+
+        self.collector._write = write
+
+    async def store(self, count: int, start: int = 0):
+        """Store given number of readings, a second apart."""
+        for i in range(start, start + count):
+            await self.collector.store_readings(
+                {'nodemcu': {'mq135': {'co': float(i), 'co2': 400.0}}},
+                1_700_000_000_000 + i * 1000,
+            )
+
+    @pytest.mark.asyncio
+    async def test_batch_size(self):
+        """Test if the buffer is written once it reaches batch_size."""
+        self.set_up(batch_size=3, flush_interval=60)
+        async with self.collector:
+            await self.store(2)
+            await asyncio.sleep(0)
+            assert not self.batches
+            assert self.collector.buffered == 2
+
+            await self.store(1, start=2)
+            await asyncio.sleep(0)
+            assert [len(batch) for batch in self.batches] == [3]
+            assert self.collector.buffered == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_interval(self):
+        """Test if the buffer is written after flush_interval seconds."""
+        self.set_up(batch_size=100, flush_interval=0.05)
+        async with self.collector:
+            await self.store(2)
+            assert not self.batches
+
+            await asyncio.sleep(0.15)
+            assert [len(batch) for batch in self.batches] == [2]
+
+    @pytest.mark.asyncio
+    async def test_max_concurrent_flushes(self):
+        """Test if producers wait, once enough batches are being written."""
+        self.set_up(batch_size=2, flush_interval=60, max_concurrent_flushes=2)
+        self.release.clear()
+
+        async with self.collector:
+            producer = asyncio.create_task(self.store(6))
+            await asyncio.sleep(0.05)
+
+            # third batch waits for a free slot
+            assert self.writing == 2
+            assert not producer.done()
+
+            self.release.set()
+            await asyncio.wait_for(producer, 1)
+            await self.collector.flush()
+
+        assert [len(batch) for batch in self.batches] == [2, 2, 2]
+
+    @pytest.mark.asyncio
+    async def test_max_concurrent_flushes_producers(self):
+        """Test if producers waiting for a slot together write no empty
+        batches."""
+        self.set_up(batch_size=2, flush_interval=60, max_concurrent_flushes=1)
+        self.release.clear()
+
+        async with self.collector:
+            producers = [
+                asyncio.create_task(self.store(4, start=i * 4))
+                for i in range(4)
+            ]
+            await asyncio.sleep(0.05)
+
+            self.release.set()
+            await asyncio.wait_for(asyncio.gather(*producers), 1)
+            await self.collector.flush()
+
+        assert all(self.batches), 'empty batch written'
+        assert sum(len(batch) for batch in self.batches) == 16
+
+    @pytest.mark.asyncio
+    async def test_flush_on_close(self):
+        """Test if the buffered points are written on close()."""
+        self.set_up(batch_size=100, flush_interval=60)
+        await self.collector.open()
+        await self.store(3)
+        assert not self.batches
+
+        await self.collector.close()
+        assert [len(batch) for batch in self.batches] == [3]
+        assert self.collector.buffered == 0
+        assert b'co=2.0' in self.batches[0][2]
+
+    @pytest.mark.asyncio
+    async def test_flush_stages_on_time(self):
+        """Test if the windows of silent devices are written on time."""
+        self.set_up(flush_interval=0.05, stages=[WindowAggregator(60)])
+        async with self.collector:
+            await self.store(3)
+            await asyncio.sleep(0.15)
+
+            # readings from 2023 belong to a window, which ended long ago
+            assert len(self.batches) == 1
+            assert b'co_count=3.0' in self.batches[0][0]
+
+        # nothing is left for close()
+        assert len(self.batches) == 1
+
+    @pytest.mark.asyncio
+    async def test_replay_rejected(self, tmp_path):
+        """Test if batches rejected for good do not block the spool."""
+        self.set_up(spool_dir=str(tmp_path), replay_batch_size=4)
+        spool = self.collector._spool
+        spool.append([b'too-large', b'retention'] + [b'ok'] * 2)
+        spool.append([b'ok'] * 2)
+
+        async def write(lines: list[bytes]):
+            if len(lines) > 1 and b'too-large' in lines:
+                raise ApiException(status=413)
+            if b'retention' in lines:
+                raise ApiException(status=422)
+            self.batches.append(lines)
+
+        self.collector._write = write
+        await self.collector._replay()
+
+        assert spool.empty()
+        assert [line for batch in self.batches for line in batch] == [
+            b'too-large',
+            b'ok',
+            b'ok',
+            b'ok',
+            b'ok',
+        ]
@@ -0,0 +1,50 @@
+"""
+Test class for DeadbandFilter.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from ahttpdc.read.store.filter import DeadbandFilter
+
+
+def record(timestamp, **fields):
+    """Record of JSONInfluxParser with given fields."""
+    return {
+        'measurement': 'sensor_data',
+        'tags': {'device': 'nodemcu'},
+        'timestamp': timestamp,
+        'fields': fields,
+    }
+
+
+class TestDeadbandFilter:
+    """Test class for DeadbandFilter class from ahttpdc.read.store.filter
+    module."""
+
+    def test_deadband(self):
+        """Test if fields within their deadband are dropped."""
+        deadband = DeadbandFilter({'altitude': 0.5}, heartbeat=60)
+
+        assert deadband.process(record(0, altitude=149.5, co=2.5)) == [
+            record(0, altitude=149.5, co=2.5)
+        ]
+        assert deadband.process(record(1000, altitude=149.9, co=2.6)) == [
+            record(1000, co=2.6)
+        ]
+        assert deadband.process(record(2000, altitude=149.9, co=2.6)) == []
+
+        # compared with the last written value, not the last seen one
+        assert deadband.process(record(3000, altitude=150.1, co=2.6)) == [
+            record(3000, altitude=150.1)
+        ]
+        assert deadband.passed == 4 and deadband.dropped == 4
+
+    def test_heartbeat(self):
+        """Test if unchanged fields are written every heartbeat."""
+        deadband = DeadbandFilter(heartbeat=10)
+
+        deadband.process(record(0, co=2.5))
+        assert deadband.process(record(9999, co=2.5)) == []
+        assert deadband.process(record(10000, co=2.5)) == [
+            record(10000, co=2.5)
+        ]
@@ -0,0 +1,47 @@
+"""
+Test class for LineSerializer.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from influxdb_client.client.write.point import Point
+from influxdb_client.domain.write_precision import WritePrecision
+
+from ahttpdc.read.store.serialize import LineSerializer
+
+
+class TestLineSerializer:
+    """Test class for LineSerializer class from ahttpdc.read.store.serialize
+    module."""
+
+    def test_serialize(self):
+        """Test if the line matches the one of the InfluxDB client."""
+        record = {
+            'measurement': 'sensor_data',
+            'tags': {'device': 'node mcu,1'},
+            'fields': {'co': 2.56, 'co2': 402.08},
+            'timestamp': 1715000000000,
+        }
+        expected = Point.from_dict(
+            record,
+            write_precision=WritePrecision.MS,
+            record_time_key='timestamp',
+        ).to_line_protocol()
+
+        assert LineSerializer().serialize(record) == expected.encode()
+
+    def test_non_finite(self):
+        """Test if non-finite values are skipped."""
+        serializer = LineSerializer()
+        record = {
+            'measurement': 'sensor_data',
+            'tags': {'device': 'nodemcu'},
+            'fields': {'co': float('nan'), 'co2': 402.08},
+            'timestamp': 1,
+        }
+        assert serializer.serialize(record) == (
+            b'sensor_data,device=nodemcu co2=402.08 1'
+        )
+
+        record['fields'] = {'co': float('inf')}
+        assert serializer.serialize(record) is None
@@ -0,0 +1,54 @@
+"""
+Test class for Spool.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from ahttpdc.read.store.spool import Spool
+
+
+class TestSpool:
+    """Test class for the Spool class from ahttpdc.read.store.spool module."""
+
+    lines = [
+        b'sensor_data,device=nodemcu co=2.56 1715000000000',
+        b'sensor_data,device=nodemcu co=2.57 1715000001000',
+    ]
+
+    def test_round_trip(self, tmp_path):
+        """Test if the spooled records are read back in order."""
+        spool = Spool(str(tmp_path), segment_size=1)
+        spool.append(self.lines[:1])
+        spool.append(self.lines[1:])
+
+        segments = spool.seal()
+        assert len(segments) == 2
+
+        read = [line for path in segments for line in spool.read(path)]
+        assert read == self.lines
+
+        for path in segments:
+            spool.remove(path)
+        assert spool.empty()
+
+    def test_recovery(self, tmp_path):
+        """Test if segments left by the previous run are picked up."""
+        Spool(str(tmp_path)).append(self.lines)
+
+        spool = Spool(str(tmp_path))
+        spool.append(self.lines)
+
+        segments = spool.seal()
+        assert len(segments) == 2
+        assert spool.read(segments[0]) == self.lines
+
+    def test_size_limit(self, tmp_path):
+        """Test if the oldest segments are discarded over the limit."""
+        size = len(self.lines[0]) + 1
+        spool = Spool(str(tmp_path), segment_size=1, max_bytes=2 * size)
+        for line in self.lines * 2:
+            spool.append([line])
+
+        segments = spool.seal()
+        assert spool.size <= 2 * size
+        assert [spool.read(path)[0] for path in segments] == self.lines
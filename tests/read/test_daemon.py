@@ -0,0 +1,50 @@
+"""
+Test class for the control channel of DataDaemon.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import time
+
+from ahttpdc.read.daemon import DataDaemon
+
+
+class TestDataDaemon:
+    """Test class for DataDaemon class from ahttpdc.read.daemon module."""
+
+    def set_up(self):
+        """Set the DataDaemon object up for testing."""
+        self.daemon = DataDaemon(
+            {'mq135': ['co', 'co2']},
+            'http://localhost:1',  # writes fail, readings are buffered
+            'token',
+            'org',
+            'bucket',
+            srv_url='http://localhost:9000/circumstances',
+            interval=0.1,
+            batch_size=1000,
+            flush_interval=60,
+        )
+
+    def test_status_and_stop(self):
+        """Test if the daemon reports its status and stops gracefully."""
+        self.set_up()
+        assert self.daemon.status() is None, 'status of a stopped daemon'
+
+        self.daemon.enable()
+        try:
+            time.sleep(0.5)
+
+            status = self.daemon.status()
+            assert status['buffered'] > 0
+            assert status['devices']['http://localhost:9000/circumstances'][
+                'ticks'
+            ]
+
+            final = self.daemon.disable(timeout=10)
+            assert final is not None
+            assert final['queued'] == 0 and final['buffered'] == 0
+            assert self.daemon.status() is None, 'daemon still running'
+        finally:
+            # worker processes would keep the session running
+            self.daemon.disable(timeout=10)
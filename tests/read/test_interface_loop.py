@@ -0,0 +1,95 @@
+"""
+Test class for the event loop of DatabaseInterface.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from ahttpdc.read.database_interface import DatabaseInterface
+
+
+class TestInterfaceLoop:
+    """Test class for the loop thread running the queries of the
+    DatabaseInterface, with the queries replaced by stubs."""
+
+    def set_up(self):
+        """Set the DatabaseInterface object up, with stubbed queries."""
+        self.interface = DatabaseInterface(
+            {'mq135': ['co', 'co2']},
+            'localhost',
+            1,
+            'token',
+            'org',
+            'bucket',
+            srv_ip='localhost',
+        )
+        self.closed = 0
+
+        async def latest():
+            # identifies the loop and the thread the query ran on
+            return asyncio.get_running_loop(), threading.current_thread()
+
+        async def stream(start, end, chunk_size):
+            for chunk in range(3):
+                yield chunk
+
+        async def close():
+            self.closed += 1
+
+        self.interface._query.latest = latest
+        self.interface._query.historical_stream = stream
+        self.interface._query.close = close
+
+    def test_loop_started_once(self):
+        """Test if queries from many threads share a single loop thread."""
+        self.set_up()
+        assert self.interface._loop is None, 'loop started before a query'
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(
+                pool.map(lambda _: self.interface.query_latest(), range(32))
+            )
+
+        assert len({loop for loop, _ in results}) == 1
+        assert {thread.name for _, thread in results} == {'ahttpdc-query-loop'}
+        self.interface.close()
+
+    def test_close(self):
+        """Test if close() releases the clients and stops the loop."""
+        self.set_up()
+        loop, thread = self.interface.query_latest()
+
+        self.interface.close()
+        assert self.closed == 1
+        assert loop.is_closed() and not thread.is_alive()
+        assert self.interface._loop is None
+
+        # closing again does nothing, next query starts a new loop
+        self.interface.close()
+        assert self.closed == 1
+        with self.interface:
+            assert self.interface.query_latest()[0] is not loop
+        assert self.closed == 2
+
+    @pytest.mark.asyncio
+    async def test_await_from_other_loop(self):
+        """Test if the asynchronous methods run on the loop of the interface,
+        without blocking the awaiting loop."""
+        self.set_up()
+        loop, _ = await self.interface.aquery_latest()
+        assert loop is not asyncio.get_running_loop()
+
+        chunks = [
+            chunk
+            async for chunk in self.interface.aquery_historical_stream('-1d')
+        ]
+        assert chunks == [0, 1, 2]
+        assert list(self.interface.query_historical_stream('-1d')) == [0, 1, 2]
+
+        await asyncio.to_thread(self.interface.close)
+        assert self.closed == 1
@@ -0,0 +1,103 @@
+"""
+Test class for ReadingQueue.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+
+import pytest
+
+from ahttpdc.read.pipeline import ReadingQueue
+
+
+class TestReadingQueue:
+    """Test class for the backpressure policies of ReadingQueue."""
+
+    @staticmethod
+    async def drain(queue: ReadingQueue) -> list[int]:
+        """Take every item waiting in the queue."""
+        items = []
+        while queue.qsize():
+            items.append(await queue.get())
+            queue.task_done()
+        return items
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest(self):
+        """Test if the oldest items are discarded, when the queue is full."""
+        queue = ReadingQueue(3, 'drop-oldest')
+        for i in range(5):
+            await queue.put(i)
+
+        assert queue.dropped == 2
+        assert await self.drain(queue) == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_spill_keeps_order(self):
+        """Test if items overflowing to the disk keep their order."""
+        queue = ReadingQueue(2, 'spill')
+        for i in range(6):
+            await queue.put({'reading': i})
+
+        assert queue.spilled == 4
+        items = await self.drain(queue)
+        assert [item['reading'] for item in items] == list(range(6))
+
+        await asyncio.wait_for(queue.join(), 1)
+        queue.close()
+
+    @pytest.mark.asyncio
+    async def test_block(self):
+        """Test if the producer waits for the consumer."""
+        queue = ReadingQueue(1, 'block')
+        await queue.put(0)
+
+        producer = asyncio.create_task(queue.put(1))
+        await asyncio.sleep(0.01)
+        assert not producer.done()
+
+        assert await self.drain(queue) == [0]
+        await producer
+        assert await self.drain(queue) == [1]
+
+    def test_unknown_policy(self):
+        """Test if unknown policies are rejected."""
+        with pytest.raises(ValueError):
+            ReadingQueue(1, 'ignore')
+
+    @pytest.mark.asyncio
+    async def test_cancelled_put(self):
+        """Test if a cancelled, blocked put does not stall join()."""
+        queue = ReadingQueue(1, 'block')
+        await queue.put(0)
+
+        blocked = asyncio.create_task(queue.put(1))
+        await asyncio.sleep(0)
+        blocked.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+
+        assert await self.drain(queue) == [0]
+        await asyncio.wait_for(queue.join(), 1)
+
+    @pytest.mark.asyncio
+    async def test_join_mark(self):
+        """Test if join() waits only for the items put before the mark."""
+        queue = ReadingQueue(10, 'block')
+        await queue.put(0)
+        await queue.put(1)
+        mark = queue.mark()
+        await queue.put(2)
+
+        joined = asyncio.create_task(queue.join(mark))
+        assert await queue.get() == 0
+        assert await queue.get() == 1
+        queue.task_done()
+        await asyncio.sleep(0)
+        assert not joined.done()
+
+        # the item put after the mark is still queued
+        queue.task_done()
+        await asyncio.wait_for(joined, 1)
+        assert queue.qsize() == 1
@@ -0,0 +1,54 @@
+"""
+Test class for FixedRateScheduler.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+
+import pytest
+
+from ahttpdc.read.schedule import FixedRateScheduler
+
+
+class TestFixedRateScheduler:
+    """Test class for the FixedRateScheduler class."""
+
+    @pytest.mark.asyncio
+    async def test_no_drift(self):
+        """Test if the time spent between ticks does not stretch the period."""
+        loop = asyncio.get_running_loop()
+        scheduler = FixedRateScheduler(0.05)
+
+        start = loop.time()
+        async for _ in scheduler:
+            await asyncio.sleep(0.03)
+            if scheduler.ticks == 5:
+                break
+
+        # 4 periods and the work after the last tick, without the drift
+        assert loop.time() - start == pytest.approx(0.23, abs=0.03)
+        assert scheduler.missed == 0
+
+    @pytest.mark.asyncio
+    async def test_missed_ticks(self):
+        """Test if ticks are skipped and reported, when the consumer is
+        late."""
+        scheduler = FixedRateScheduler(0.02)
+
+        missed = []
+        async for count in scheduler:
+            missed.append(count)
+            if scheduler.ticks == 1:
+                await asyncio.sleep(0.07)
+            elif scheduler.ticks == 3:
+                break
+
+        assert missed[0] == 0
+        assert missed[1] == 2
+        assert scheduler.missed == 2
+
+    def test_invalid_interval(self):
+        """Test if non-positive intervals are rejected."""
+        with pytest.raises(ValueError):
+            FixedRateScheduler(0)
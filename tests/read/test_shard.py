@@ -0,0 +1,47 @@
+"""
+Test class for HashRing.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+from collections import Counter
+
+import pytest
+
+from ahttpdc.read.shard import HashRing
+
+
+class TestHashRing:
+    """Test class for HashRing class from ahttpdc.read.shard module."""
+
+    keys = [
+        f'http://192.168.{i // 256}.{i % 256}/circumstances'
+        for i in range(2000)
+    ]
+
+    def test_balance(self):
+        """Test if the keys are spread evenly over the nodes."""
+        ring = HashRing(range(4))
+        counts = Counter(ring.node(key) for key in self.keys)
+
+        assert set(counts) == {0, 1, 2, 3}
+        assert max(counts.values()) < 1.3 * len(self.keys) / 4
+
+    def test_consistency(self):
+        """Test if adding a node moves only the keys it takes over."""
+        ring = HashRing(range(4))
+        before = {key: ring.node(key) for key in self.keys}
+
+        ring.add(4)
+        moved = [key for key in self.keys if ring.node(key) != before[key]]
+
+        assert all(ring.node(key) == 4 for key in moved)
+        assert len(moved) < 0.3 * len(self.keys)
+
+        ring.remove(4)
+        assert {key: ring.node(key) for key in self.keys} == before
+
+    def test_empty(self):
+        """Test if looking up a key on an empty ring fails."""
+        with pytest.raises(LookupError):
+            HashRing().node('key')
@@ -0,0 +1,124 @@
+"""
+Test class for the polling of DaemonWorker.
+
+Author: Piotr Krzysztof Lis - github.com/straightchlorine
+"""
+
+import asyncio
+import multiprocessing
+import threading
+
+import aiohttp
+
+from ahttpdc.read.device import Device
+from ahttpdc.read.fetch.reading import Reading
+from ahttpdc.read.worker import DaemonWorker
+
+
+class TestDaemonWorker:
+    """Test class for DaemonWorker class from ahttpdc.read.worker module,
+    with the requests and writes replaced by stubs."""
+
+    def set_up(self):
+        """Set the DaemonWorker object up, with stubbed devices."""
+        self.worker = DaemonWorker(
+            {'mq135': ['co']},
+            'http://localhost:1',
+            'token',
+            'org',
+            'bucket',
+            [
+                Device('http://slow', 0.1),
+                Device('http://fast', 0.1),
+                Device('http://refused', 0.1),
+                Device('http://broken', 0.1),
+            ],
+            failure_threshold=100,
+        )
+        self.stored: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def capture(url: str) -> Reading:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                if url == 'http://slow':
+                    await asyncio.sleep(0.25)
+                elif url == 'http://fast':
+                    await asyncio.sleep(0.01)
+                elif url == 'http://refused':
+                    raise aiohttp.ClientConnectionError('refused')
+                elif url == 'http://broken':
+                    raise RuntimeError('unexpected')
+                return Reading({url: {'mq135': {'co': 1.0}}}, 0, 0)
+            finally:
+                self.in_flight -= 1
+
+        async def store_readings(payload: dict, timestamp: int):
+            (url,) = payload
+            self.stored.append(url)
+
+        new_collector = self.worker._new_collector
+
+        def collector():
+            collector = new_collector()
+            collector.store_readings = store_readings
+            return collector
+
+        self.worker._fetcher.capture = capture
+        self.worker._new_collector = collector
+
+    def run(self, duration: float) -> dict:
+        """Run the worker for given time and provide its final status."""
+        control, channel = multiprocessing.Pipe()
+        thread = threading.Thread(target=self.worker.run, args=(channel,))
+        thread.start()
+
+        try:
+            assert not control.poll(duration), 'worker exited early'
+            control.send((0, 'stop'))
+            assert control.poll(10), 'worker did not stop'
+            request, status = control.recv()
+            assert request == 0
+        finally:
+            thread.join()
+            control.close()
+            channel.close()
+        return status
+
+    def test_concurrent_devices(self):
+        """Test if the devices are polled concurrently, and failing ones do
+        not affect the others."""
+        self.set_up()
+        status = self.run(0.6)
+        devices = status['devices']
+
+        # slow requests do not delay the other devices
+        assert self.max_in_flight >= 2
+        assert devices['http://fast']['ticks'] >= 5
+        assert self.stored.count('http://fast') >= 5
+        assert self.stored.count('http://slow') >= 2
+
+        # failing devices keep their schedule and store nothing
+        for name in ('http://refused', 'http://broken'):
+            assert devices[name]['ticks'] >= 5
+            assert name not in self.stored
+        assert status['queued'] == 0
+
+    def test_restart_spool(self, tmp_path):
+        """Test if every run of the worker picks up the spool left on the
+        disk by the previous one."""
+        self.set_up()
+        self.worker.devices = [Device('http://fast', 0.05)]
+        self.worker.spool_dir = str(tmp_path)
+        del self.worker._new_collector
+
+        sizes = []
+        for _ in range(3):
+            sizes.append(self.run(0.3)['spooled'])
+
+        # writes into the unreachable database are spooled
+        on_disk = sum(path.stat().st_size for path in tmp_path.iterdir())
+        assert 0 < sizes[0] < sizes[1] < sizes[2] == on_disk
+        assert len(list(tmp_path.iterdir())) == 3